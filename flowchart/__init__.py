@@ -2,3 +2,15 @@
 # -*- coding: utf-8 -*-
 
 # 使flowchart目录成为Python包
+
+import sys
+
+
+def get_item_types(main_window):
+    """返回主窗口所在模块定义的节点类和连接线类
+    
+    主程序以脚本方式运行（文件名含连字符，无法直接import），
+    因此从主窗口类所在的模块中取出这两个类，供isinstance判断使用。
+    """
+    module = sys.modules[type(main_window).__module__]
+    return module.FlowchartNode, module.FlowchartConnection
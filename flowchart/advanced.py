@@ -1,14 +1,46 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from collections import defaultdict
+from contextlib import contextmanager
+
 from PyQt5.QtWidgets import (QAction, QShortcut, QMessageBox, QDialog, QVBoxLayout, 
                             QLabel, QTableWidget, QTableWidgetItem, QHeaderView, 
                             QPushButton, QDialogButtonBox)
 from PyQt5.QtCore import Qt, QPointF, QRectF
-from PyQt5.QtGui import QKeySequence
+from PyQt5.QtGui import QKeySequence, QBrush
 
 # 导入保存函数
-from flowchart import save_functions
+from flowchart import save_functions, get_item_types
+
+# 快捷键表：(按键, 方法名, 描述)，这里只保存普通数据，QKeySequence要在QApplication创建之后才能构建
+# 方法名先在快捷键管理器上查找，找不到时使用主窗口的同名方法
+_SHORTCUT_TABLE = [
+    # 文件操作快捷键
+    (QKeySequence.New, "newFlowchart", "新建流程图"),
+    (QKeySequence.Open, "openFlowchart", "打开流程图"),
+    (QKeySequence.Save, "save_flowchart", "保存流程图"),
+    (QKeySequence.SaveAs, "save_flowchart_as", "另存为"),
+    
+    # 编辑操作快捷键
+    (QKeySequence.Undo, "undo", "撤销"),
+    (QKeySequence.Redo, "redo", "重做"),
+    (QKeySequence.Delete, "deleteSelected", "删除选中"),
+    
+    # 视图操作快捷键 - 暂时移除缩放相关快捷键
+    
+    # 导出快捷键
+    (Qt.CTRL + Qt.Key_E, "export_flowchart", "导出"),
+    
+    # 折叠/展开快捷键
+    (Qt.CTRL + Qt.Key_F, "toggle_fold_selected", "折叠/展开选中节点"),
+    
+    # 自动布局快捷键
+    (Qt.CTRL + Qt.Key_L, "auto_layout", "自动布局"),
+    
+    # 帮助快捷键
+    (Qt.Key_F1, "show_shortcuts_help", "显示快捷键帮助"),
+]
 
 class KeyboardShortcutManager:
     """键盘快捷键管理器"""
@@ -20,33 +52,9 @@ class KeyboardShortcutManager:
     
     def _setup_shortcuts(self):
         """设置快捷键"""
-        # 文件操作快捷键
-        self._add_shortcut(QKeySequence.New, self.main_window.newFlowchart, "新建流程图")
-        self._add_shortcut(QKeySequence.Open, self.main_window.openFlowchart, "打开流程图")
-        self._add_shortcut(QKeySequence.Save, lambda: save_functions.save_flowchart(self.main_window), "保存流程图")
-        self._add_shortcut(QKeySequence.SaveAs, lambda: save_functions.save_flowchart_as(self.main_window), "另存为")
-        
-        # 编辑操作快捷键
-        self._add_shortcut(QKeySequence.Undo, self.main_window.undo, "撤销")
-        self._add_shortcut(QKeySequence.Redo, self.main_window.redo, "重做")
-        self._add_shortcut(QKeySequence.Delete, self.main_window.deleteSelected, "删除选中")
-        
-        # 视图操作快捷键 - 暂时移除缩放相关快捷键
-        
-        # 导出快捷键
-        self._add_shortcut(QKeySequence(Qt.CTRL + Qt.Key_E), 
-                          lambda: self.main_window.exporter.export_flowchart(), "导出")
-        
-        # 折叠/展开快捷键
-        self._add_shortcut(QKeySequence(Qt.CTRL + Qt.Key_F), 
-                          lambda: self.toggle_fold_selected(), "折叠/展开选中节点")
-        
-        # 自动布局快捷键
-        self._add_shortcut(QKeySequence(Qt.CTRL + Qt.Key_L), 
-                          lambda: AutoLayoutAlgorithm(self.main_window).apply_layout(), "自动布局")
-        
-        # 帮助快捷键
-        self._add_shortcut(QKeySequence(Qt.Key_F1), self.show_shortcuts_help, "显示快捷键帮助")
+        for key, method_name, description in _SHORTCUT_TABLE:
+            owner = self if hasattr(self, method_name) else self.main_window
+            self._add_shortcut(QKeySequence(key), getattr(owner, method_name), description)
     
     def _add_shortcut(self, key_sequence, callback, description=None):
         """添加快捷键"""
@@ -55,19 +63,50 @@ class KeyboardShortcutManager:
         if description:
             shortcut.setWhatsThis(description)
     
+    def save_flowchart(self):
+        """保存流程图"""
+        save_functions.save_flowchart(self.main_window)
+    
+    def save_flowchart_as(self):
+        """流程图另存为"""
+        save_functions.save_flowchart_as(self.main_window)
+    
+    def export_flowchart(self):
+        """导出流程图"""
+        self.main_window.exporter.export_flowchart()
+    
+    def auto_layout(self):
+        """自动布局"""
+        AutoLayoutAlgorithm(self.main_window).apply_layout()
+    
     def toggle_fold_selected(self):
         """折叠/展开选中的节点"""
+        node_cls, _ = get_item_types(self.main_window)
         selected_nodes = [item for item in self.main_window.scene.selectedItems() 
-                         if hasattr(item, 'node_type')]
+                         if isinstance(item, node_cls)]
         
         if not selected_nodes:
             QMessageBox.information(self.main_window, "提示", "请先选择要折叠/展开的节点")
             return
         
+        folder = get_node_folder(self.main_window)
         for node in selected_nodes:
-            self._toggle_fold_node(node)
+            folder.toggle_fold_node(node)
+    
+    def show_shortcuts_help(self):
+        """显示快捷键帮助对话框"""
+        dialog = ShortcutsHelpDialog(self.main_window)
+        dialog.exec_()
+
+
+class NodeFolder:
+    """节点折叠/展开处理器，每个主窗口只创建一个"""
+    
+    def __init__(self, main_window):
+        """初始化折叠处理器"""
+        self.main_window = main_window
     
-    def _toggle_fold_node(self, node):
+    def toggle_fold_node(self, node):
         """折叠或展开单个节点"""
         # 获取节点的所有子节点
         child_nodes = node.get_child_nodes()
@@ -79,9 +118,9 @@ class KeyboardShortcutManager:
         # 检查节点是否已经被折叠
         is_folded = getattr(node, 'is_folded', False)
         
-        # 如果有多层子节点，则询问用户是否要折叠所有层级
-        all_descendants = node.getAllChildNodes()
-        if len(all_descendants) > len(child_nodes) and not is_folded:
+        # 如果有多层子节点，则询问用户是否要折叠所有层级（找到一个孙节点即可确定）
+        has_grandchildren = any(child.get_child_nodes() for child in child_nodes)
+        if has_grandchildren and not is_folded:
             # 如果这个节点有多个层级的子节点，询问用户是否要折叠所有层级
             reply = QMessageBox.question(
                 self.main_window,
@@ -95,87 +134,137 @@ class KeyboardShortcutManager:
                 return
             elif reply == QMessageBox.Yes:
                 # 折叠所有层级
-                self._fold_all_levels(node)
+                self.fold_all_levels(node)
                 return
             # 如果选择No，则只折叠第一层子节点，继续执行下面的代码
         
         if is_folded:
             # 展开节点
-            self._expand_node(node, child_nodes)
+            self.expand_node(node, child_nodes)
         else:
             # 折叠节点
-            self._collapse_node(node, child_nodes)
+            self.collapse_node(node, child_nodes)
     
-    def _fold_all_levels(self, node):
+    def fold_all_levels(self, node):
         """折叠节点的所有层级子节点"""
         # 获取所有子节点（包括子节点的子节点）
         all_descendants = node.getAllChildNodes()
         
-        # 首先将所有子节点设置为可见
-        for child in all_descendants:
-            child.setVisible(True)
-            if hasattr(child, 'is_folded') and child.is_folded:
-                child.is_folded = False
-        
-        # 然后折叠当前节点，隐藏所有子节点
-        direct_children = node.get_child_nodes()
-        self._collapse_node(node, direct_children)
-        
-        # 对于所有具有子节点的子节点，也将其标记为折叠状态
-        for child in direct_children:
-            if child.get_child_nodes():
-                child.is_folded = True
-                
-        # 更新场景
-        node.scene().update()
+        with batch_scene_update(self.main_window) as affected:
+            # 首先将所有子节点设置为可见
+            for child in all_descendants:
+                child.setVisible(True)
+                if hasattr(child, 'is_folded') and child.is_folded:
+                    child.is_folded = False
+            affected.extend(all_descendants)
+            
+            # 然后折叠当前节点，隐藏所有子节点
+            direct_children = node.get_child_nodes()
+            self.collapse_node(node, direct_children)
+            
+            # 对于所有具有子节点的子节点，也将其标记为折叠状态
+            for child in direct_children:
+                if child.get_child_nodes():
+                    child.is_folded = True
+    
+    def _build_edge_index(self):
+        """遍历一次场景，构建 起始节点 -> {终止节点: 连接线} 的索引"""
+        _, conn_cls = get_item_types(self.main_window)
+        edges_by_start = {}
+        for item in self.main_window.scene.items():
+            if isinstance(item, conn_cls):
+                edges_by_start.setdefault(item.start_node, {})[item.end_node] = item
+        return edges_by_start
     
-    def _collapse_node(self, node, child_nodes):
+    def collapse_node(self, node, child_nodes):
         """折叠节点，隐藏其所有子节点"""
         # 保存子节点的原始可见性状态
         node.children_visibility = {}
         
-        # 递归隐藏所有子节点
-        for child in child_nodes:
-            node.children_visibility[child] = child.isVisible()
-            child.setVisible(False)
-            
-            # 隐藏连接线
-            for conn in self.main_window.scene.items():
-                if hasattr(conn, 'start_node') and hasattr(conn, 'end_node'):
-                    if conn.start_node == node and conn.end_node == child:
-                        conn.setVisible(False)
-        
-        # 标记节点为已折叠
-        node.is_folded = True
+        # 当前节点发出的连接线
+        edges = self._build_edge_index().get(node, {})
         
-        # 更新节点外观以指示其已折叠
-        node.setBrush(node.color.darker(120))
-        node.update()
+        with batch_scene_update(self.main_window) as affected:
+            # 递归隐藏所有子节点
+            for child in child_nodes:
+                node.children_visibility[child] = child.isVisible()
+                child.setVisible(False)
+                affected.append(child)
+                
+                # 隐藏连接线
+                conn = edges.get(child)
+                if conn:
+                    conn.setVisible(False)
+                    affected.append(conn)
+            
+            # 标记节点为已折叠
+            node.is_folded = True
+            
+            # 更新节点外观以指示其已折叠（暗色画刷按节点颜色缓存）
+            if getattr(node, '_folded_brush_key', None) != node.color.rgba():
+                node._folded_brush = QBrush(node.color.darker(120))
+                node._folded_brush_key = node.color.rgba()
+            node.setBrush(node._folded_brush)
+            affected.append(node)
     
-    def _expand_node(self, node, child_nodes):
+    def expand_node(self, node, child_nodes):
         """展开节点，显示其直接子节点"""
         # 恢复子节点的可见性
-        if hasattr(node, 'children_visibility'):
-            for child, was_visible in node.children_visibility.items():
-                child.setVisible(was_visible)
-                
-                # 恢复连接线可见性
-                for conn in self.main_window.scene.items():
-                    if hasattr(conn, 'start_node') and hasattr(conn, 'end_node'):
-                        if conn.start_node == node and conn.end_node == child:
-                            conn.setVisible(True)
-        
-        # 标记节点为未折叠
-        node.is_folded = False
-        
-        # 恢复节点外观
-        node.setBrush(node.color)
-        node.update()
+        with batch_scene_update(self.main_window) as affected:
+            if hasattr(node, 'children_visibility'):
+                edges = self._build_edge_index().get(node, {})
+                for child, was_visible in node.children_visibility.items():
+                    child.setVisible(was_visible)
+                    affected.append(child)
+                    
+                    # 恢复连接线可见性（隐藏期间节点移动不会更新连接线，显示前先更新）
+                    conn = edges.get(child)
+                    if conn:
+                        conn.updatePosition()
+                        conn.setVisible(True)
+                        affected.append(conn)
+            
+            # 标记节点为未折叠
+            node.is_folded = False
+            
+            # 恢复节点外观（默认渐变画刷）
+            node.setBrush(None)
+            affected.append(node)
+
+
+@contextmanager
+def batch_scene_update(main_window):
+    """批量修改场景期间暂停视图刷新，结束时重新启用刷新，视图整体重绘一次
     
-    def show_shortcuts_help(self):
-        """显示快捷键帮助对话框"""
-        dialog = ShortcutsHelpDialog(self.main_window)
-        dialog.exec_()
+    with块中得到一个列表，加入其中的图元所在区域还会通知场景更新，场景的其他视图也会刷新这些区域。
+    """
+    scene = main_window.scene
+    view = main_window.view
+    affected = []
+    
+    was_enabled = view.updatesEnabled()
+    view.setUpdatesEnabled(False)
+    was_blocked = scene.blockSignals(True)
+    try:
+        yield affected
+    finally:
+        scene.blockSignals(was_blocked)
+        view.setUpdatesEnabled(was_enabled)
+        
+        # 重新启用刷新时视图已整体重绘；再合并受影响图元的区域通知场景一次
+        if affected:
+            region = QRectF()
+            for item in affected:
+                region = region.united(item.sceneBoundingRect())
+            scene.update(region)
+
+
+def get_node_folder(main_window):
+    """获取主窗口的折叠处理器，不存在时创建一次"""
+    folder = getattr(main_window, 'node_folder', None)
+    if folder is None:
+        folder = main_window.node_folder = NodeFolder(main_window)
+    return folder
 
 
 class ShortcutsHelpDialog(QDialog):
@@ -233,11 +322,21 @@ class ShortcutsHelpDialog(QDialog):
             ("F1", "显示此帮助")
         ]
         
-        self.shortcuts_table.setRowCount(len(shortcuts))
+        # 填充期间暂停刷新和排序，列宽在填充完成后再统一调整
+        table = self.shortcuts_table
+        header = table.horizontalHeader()
+        table.setUpdatesEnabled(False)
+        table.setSortingEnabled(False)
+        header.setSectionResizeMode(QHeaderView.Fixed)
+        
+        table.setRowCount(len(shortcuts))
         
         for i, (key, description) in enumerate(shortcuts):
-            self.shortcuts_table.setItem(i, 0, QTableWidgetItem(key))
-            self.shortcuts_table.setItem(i, 1, QTableWidgetItem(description))
+            table.setItem(i, 0, QTableWidgetItem(key))
+            table.setItem(i, 1, QTableWidgetItem(description))
+        
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        table.setUpdatesEnabled(True)
 
 
 def extend_node_mouse_double_click_event(node, event, main_window):
@@ -252,15 +351,12 @@ def extend_node_mouse_double_click_event(node, event, main_window):
     # 检查节点是否已经被折叠
     is_folded = getattr(node, 'is_folded', False)
     
-    # 创建快捷键管理器的实例（如果不存在）
-    if not hasattr(main_window, 'shortcut_manager'):
-        main_window.shortcut_manager = KeyboardShortcutManager(main_window)
-    
-    # 使用快捷键管理器的方法来折叠/展开节点
+    # 使用主窗口的折叠处理器来折叠/展开节点
+    folder = get_node_folder(main_window)
     if is_folded:
-        main_window.shortcut_manager._expand_node(node, child_nodes)
+        folder.expand_node(node, child_nodes)
     else:
-        main_window.shortcut_manager._collapse_node(node, child_nodes)
+        folder.collapse_node(node, child_nodes)
 
 
 class AutoLayoutAlgorithm:
@@ -275,27 +371,34 @@ class AutoLayoutAlgorithm:
         self.horizontal_spacing = 100  # 水平间距
         self.vertical_spacing = 80     # 垂直间距
         self.level_height = 120        # 每层高度
+        
+        # 父节点 -> 子节点列表的邻接表，在apply_layout中一次性构建
+        self._children_map = defaultdict(list)
+        
+        # 节点 -> 子树宽度的缓存，每次布局时重新计算
+        self._width_cache = {}
     
     def apply_layout(self):
         """应用自动布局算法"""
-        # 获取所有节点
-        nodes = [item for item in self.scene.items() if hasattr(item, 'node_type')]
+        # 只遍历一次场景，同时收集节点并构建邻接表
+        nodes = []
+        has_parent = set()
+        self._children_map = defaultdict(list)
+        self._width_cache = {}
+        node_cls, conn_cls = get_item_types(self.main_window)
+        for item in self.scene.items():
+            if isinstance(item, node_cls):
+                nodes.append(item)
+            elif isinstance(item, conn_cls):
+                self._children_map[item.start_node].append(item.end_node)
+                has_parent.add(item.end_node)
         
         if not nodes:
             QMessageBox.information(self.main_window, "提示", "当前没有节点可布局")
             return
         
         # 找到根节点（没有父节点的节点）
-        root_nodes = []
-        for node in nodes:
-            has_parent = False
-            for conn in self.scene.items():
-                if hasattr(conn, 'start_node') and hasattr(conn, 'end_node'):
-                    if conn.end_node == node:
-                        has_parent = True
-                        break
-            if not has_parent:
-                root_nodes.append(node)
+        root_nodes = [node for node in nodes if node not in has_parent]
         
         if not root_nodes:
             # 如果没有找到根节点，使用第一个节点作为根节点
@@ -313,71 +416,82 @@ class AutoLayoutAlgorithm:
             # 更新下一个树的水平偏移
             x_offset += tree_width + self.horizontal_spacing * 2
     
-    def _calculate_tree_width(self, node, level=0, visited=None):
-        """计算以node为根的树的宽度"""
-        if visited is None:
-            visited = set()
-        
-        # 避免循环引用
-        if node in visited:
-            return node.width
-        
-        visited.add(node)
-        
-        # 获取子节点
-        children = self._get_children(node)
-        
-        if not children:
-            return node.width
-        
-        # 计算所有子树的宽度总和
-        total_width = sum(self._calculate_tree_width(child, level+1, visited) for child in children)
-        
-        # 考虑子节点之间的间距
-        if len(children) > 1:
-            total_width += self.horizontal_spacing * (len(children) - 1)
+    def _calculate_tree_width(self, root):
+        """计算以root为根的树的宽度（迭代后序遍历，结果缓存在_width_cache中）"""
+        cache = self._width_cache
+        if root in cache:
+            return cache[root]
+        
+        on_path = set()  # 当前遍历路径上的节点，用于避免循环引用
+        stack = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            children = self._get_children(node)
+            
+            if children_done:
+                on_path.discard(node)
+                if not children:
+                    cache[node] = node.width
+                    continue
+                
+                # 计算所有子树的宽度总和（处于循环中的子节点只计自身宽度）
+                total_width = sum(cache.get(child, child.width) for child in children)
+                
+                # 考虑子节点之间的间距
+                if len(children) > 1:
+                    total_width += self.horizontal_spacing * (len(children) - 1)
+                
+                cache[node] = max(node.width, total_width)
+                continue
+            
+            if node in cache or node in on_path:
+                continue
+            
+            on_path.add(node)
+            stack.append((node, True))
+            for child in children:
+                if child not in cache and child not in on_path:
+                    stack.append((child, False))
         
-        # 返回最大宽度
-        return max(node.width, total_width)
+        return cache[root]
     
-    def _layout_subtree(self, node, x, y, width, visited=None):
-        """递归布局子树"""
-        if visited is None:
-            visited = set()
-        
-        # 避免循环引用
-        if node in visited:
-            return
-        
-        visited.add(node)
-        
-        # 设置节点位置
-        node.setPos(x, y)
-        
-        # 获取子节点
-        children = self._get_children(node)
-        
-        if not children:
-            return
-        
-        # 计算子节点的水平位置
-        child_x = x - width/2 + node.width/2
-        
-        for child in children:
-            # 计算子树宽度
-            child_width = self._calculate_tree_width(child)
+    def _layout_subtree(self, root, x, y, width):
+        """布局以root为根的子树（显式栈迭代，避免深层树的递归开销）"""
+        visited = set()
+        stack = [(root, x, y, width)]
+        while stack:
+            node, x, y, width = stack.pop()
+            
+            # 避免循环引用
+            if node in visited:
+                continue
+            
+            visited.add(node)
             
-            # 递归布局子树
-            self._layout_subtree(child, child_x + child_width/2, y + self.level_height, child_width, visited)
+            # 设置节点位置
+            node.setPos(x, y)
+            
+            # 获取子节点
+            children = self._get_children(node)
+            
+            if not children:
+                continue
+            
+            # 计算子节点的水平位置
+            child_x = x - width/2 + node.width/2
+            
+            placements = []
+            for child in children:
+                # 子树宽度已在_calculate_tree_width中缓存
+                child_width = self._width_cache[child]
+                placements.append((child, child_x + child_width/2, y + self.level_height, child_width))
+                
+                # 更新下一个子节点的水平位置
+                child_x += child_width + self.horizontal_spacing
             
-            # 更新下一个子节点的水平位置
-            child_x += child_width + self.horizontal_spacing
+            # 逆序入栈，保证与递归版本相同的先序处理顺序
+            stack.extend(reversed(placements))
     
     def _get_children(self, node):
         """获取节点的所有子节点"""
-        children = []
-        for conn in self.scene.items():
-            if hasattr(conn, 'start_node') and hasattr(conn, 'end_node'):
-                if conn.start_node == node:
-                    children.append(conn.end_node)
-        return children
+        return self._children_map.get(node, [])
@@ -1,11 +1,30 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import struct
+import zlib
+from contextlib import contextmanager
+
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, 
                             QComboBox, QSpinBox, QPushButton, QColorDialog, QFileDialog, 
-                            QMessageBox, QDialogButtonBox)
+                            QMessageBox, QDialogButtonBox, QCheckBox, QFrame, QGraphicsItem)
 from PyQt5.QtCore import Qt, QRectF, QMarginsF
-from PyQt5.QtGui import QColor, QImage, QPainter, QPdfWriter, QPageSize
+from PyQt5.QtGui import QColor, QImage, QPainter, QPalette, QPdfWriter, QPageSize, QPicture
+
+@contextmanager
+def items_without_cache(scene):
+    """导出期间临时关闭图元的绘制缓存，结束后恢复原来的缓存模式"""
+    # 节点使用设备坐标缓存，渲染时会直接贴上按屏幕分辨率缓存的位图，放大后发虚，矢量PDF中也会变成位图
+    cached = [(item, item.cacheMode()) for item in scene.items()
+              if item.cacheMode() != QGraphicsItem.NoCache]
+    for item, _ in cached:
+        item.setCacheMode(QGraphicsItem.NoCache)
+    try:
+        yield
+    finally:
+        for item, mode in cached:
+            item.setCacheMode(mode)
+
 
 class FlowchartExporter:
     """流程图导出器，负责将流程图导出为图片或PDF"""
@@ -14,16 +33,20 @@ class FlowchartExporter:
         """初始化导出器"""
         self.main_window = main_window
         self.export_margin = 20  # 导出时的边距
+        self.strip_budget = 16 * 1024 * 1024  # PNG分条渲染时每个条带的内存上限（字节）
+        self._export_dialog = None  # 导出选项对话框，首次导出时创建并复用
     
     def export_flowchart(self):
         """导出流程图为图片或PDF"""
-        # 检查是否有内容可导出
-        if not self.main_window.scene.items():
+        # 检查是否有内容可导出（场景记录了节点数量，不必取出所有图元）
+        if not self.main_window.scene.node_count:
             QMessageBox.warning(self.main_window, "警告", "当前没有内容可导出")
             return
         
-        # 创建导出选项对话框
-        dialog = ExportDialog(self.main_window)
+        # 创建导出选项对话框（只创建一次，之后复用并保留上次的选项）
+        if self._export_dialog is None:
+            self._export_dialog = ExportDialog(self.main_window)
+        dialog = self._export_dialog
         if dialog.exec_() != QDialog.Accepted:
             return
         
@@ -43,7 +66,7 @@ class FlowchartExporter:
         
         # 根据选择的格式导出
         if export_format == "PDF":
-            self._export_to_pdf(scene_rect)
+            self._export_to_pdf(scene_rect, dialog.raster_pdf_check.isChecked(), bg_color)
         else:  # PNG 或 JPG
             self._export_to_image(scene_rect, export_format.lower(), resolution, bg_color)
     
@@ -53,40 +76,112 @@ class FlowchartExporter:
         width = int(scene_rect.width() * resolution / 72)
         height = int(scene_rect.height() * resolution / 72)
         
-        # 创建图像
-        image = QImage(width, height, QImage.Format_ARGB32)
-        image.fill(bg_color)
+        # 选择保存路径
+        file_filter = f"{image_format.upper()} 图像 (*.{image_format})"
+        file_path, _ = QFileDialog.getSaveFileName(
+            self.main_window, "导出为图片", "", file_filter
+        )
+        
+        if not file_path:
+            return
+        
+        if not file_path.lower().endswith(f".{image_format}"):
+            file_path += f".{image_format}"
+        
+        # 场景只绘制一次，后续各条带都回放同一份记录
+        picture = self._record_scene(scene_rect)
+        
+        if image_format == "png":
+            # PNG按条带渲染并逐块写入文件，内存占用与分辨率无关
+            saved = self._write_png_in_strips(file_path, picture, width, height, resolution, bg_color)
+        else:
+            # 其他格式需要完整图像才能编码
+            image = QImage(width, height, QImage.Format_ARGB32)
+            image.fill(bg_color)
+            self._render_region(image, picture, 0, resolution)
+            saved = image.save(file_path)
+        
+        if saved:
+            QMessageBox.information(self.main_window, "成功", f"流程图已成功导出为 {file_path}")
+        else:
+            QMessageBox.critical(self.main_window, "错误", f"无法保存图像到 {file_path}")
+    
+    def _record_scene(self, scene_rect):
+        """将场景记录为QPicture，之后按需回放，不必再次执行各图元的paint"""
+        picture = QPicture()
+        painter = QPainter(picture)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
         
+        # 以点为单位记录，原点对应scene_rect左上角；不使用图元缓存，记录的是矢量绘制命令，回放时按分辨率缩放仍然清晰
+        with items_without_cache(self.main_window.scene):
+            self.main_window.scene.render(
+                painter, QRectF(0, 0, scene_rect.width(), scene_rect.height()), scene_rect, Qt.IgnoreAspectRatio
+            )
+        painter.end()
+        return picture
+    
+    def _render_region(self, image, picture, top, resolution):
+        """将记录的场景中从第top行像素开始的区域回放到image上"""
         # 创建画家
         painter = QPainter(image)
         painter.setRenderHint(QPainter.Antialiasing)
         painter.setRenderHint(QPainter.TextAntialiasing)
         painter.setRenderHint(QPainter.SmoothPixmapTransform)
         
-        # 设置缩放
+        # 平移到当前条带并按分辨率缩放
+        painter.translate(0, -top)
         painter.scale(resolution / 72, resolution / 72)
-        
-        # 绘制场景
-        self.main_window.scene.render(painter, QRectF(), scene_rect)
+        picture.play(painter)
         painter.end()
+    
+    def _write_png_in_strips(self, file_path, picture, width, height, resolution, bg_color):
+        """分条带渲染场景并以流的方式写入PNG文件"""
+        def write_chunk(f, chunk_type, data):
+            f.write(struct.pack(">I", len(data)))
+            f.write(chunk_type)
+            f.write(data)
+            f.write(struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF))
         
-        # 保存图像
-        file_filter = f"{image_format.upper()} 图像 (*.{image_format})"
-        file_path, _ = QFileDialog.getSaveFileName(
-            self.main_window, "导出为图片", "", file_filter
-        )
+        row_bytes = width * 4
+        strip_height = max(1, min(height, self.strip_budget // row_bytes))
+        compressor = zlib.compressobj()
         
-        if file_path:
-            if not file_path.lower().endswith(f".{image_format}"):
-                file_path += f".{image_format}"
-            
-            if image.save(file_path):
-                QMessageBox.information(self.main_window, "成功", f"流程图已成功导出为 {file_path}")
-            else:
-                QMessageBox.critical(self.main_window, "错误", f"无法保存图像到 {file_path}")
+        try:
+            with open(file_path, "wb") as f:
+                f.write(b"\x89PNG\r\n\x1a\n")
+                # 8位RGBA
+                write_chunk(f, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+                
+                for top in range(0, height, strip_height):
+                    strip = QImage(width, min(strip_height, height - top), QImage.Format_RGBA8888)
+                    strip.fill(bg_color)
+                    self._render_region(strip, picture, top, resolution)
+                    
+                    bits = strip.constBits()
+                    bits.setsize(strip.byteCount())
+                    data = bits.asstring()
+                    stride = strip.bytesPerLine()
+                    
+                    # 每行前加过滤类型0（无过滤）
+                    raw = b"".join(
+                        b"\x00" + data[y * stride:y * stride + row_bytes]
+                        for y in range(strip.height())
+                    )
+                    compressed = compressor.compress(raw)
+                    if compressed:
+                        write_chunk(f, b"IDAT", compressed)
+                
+                write_chunk(f, b"IDAT", compressor.flush())
+                write_chunk(f, b"IEND", b"")
+        except OSError:
+            return False
+        
+        return True
     
-    def _export_to_pdf(self, scene_rect):
-        """导出为PDF格式"""
+    def _export_to_pdf(self, scene_rect, raster=False, bg_color=None):
+        """导出为PDF格式，raster为True时先渲染成图片再写入PDF（速度快，但不是矢量图）"""
         # 保存PDF
         file_path, _ = QFileDialog.getSaveFileName(
             self.main_window, "导出为PDF", "", "PDF 文件 (*.pdf)"
@@ -100,14 +195,33 @@ class FlowchartExporter:
             writer = QPdfWriter(file_path)
             writer.setPageSize(QPageSize(scene_rect.size(), QPageSize.Point))
             writer.setResolution(300)  # 设置DPI
+            # 去掉默认页边距，可绘制区域与页面一样大，光栅条带按整页尺寸绘制时不会被裁掉
+            writer.setPageMargins(QMarginsF(0, 0, 0, 0))
             
             # 创建画家
             painter = QPainter(writer)
-            painter.setRenderHint(QPainter.Antialiasing)
-            painter.setRenderHint(QPainter.TextAntialiasing)
             
-            # 绘制场景
-            self.main_window.scene.render(painter, QRectF(), scene_rect)
+            if raster:
+                # 按条带渲染为图片后贴到PDF上，耗时只与图片尺寸有关
+                resolution = writer.resolution()
+                width = int(scene_rect.width() * resolution / 72)
+                height = int(scene_rect.height() * resolution / 72)
+                strip_height = max(1, min(height, self.strip_budget // (width * 4)))
+                picture = self._record_scene(scene_rect)
+                
+                for top in range(0, height, strip_height):
+                    strip = QImage(width, min(strip_height, height - top), QImage.Format_ARGB32)
+                    strip.fill(bg_color if bg_color is not None else QColor(Qt.white))
+                    self._render_region(strip, picture, top, resolution)
+                    painter.drawImage(0, top, strip)
+            else:
+                painter.setRenderHint(QPainter.Antialiasing)
+                painter.setRenderHint(QPainter.TextAntialiasing)
+                
+                # 绘制场景（不使用图元缓存，节点以矢量形式写入PDF）
+                with items_without_cache(self.main_window.scene):
+                    self.main_window.scene.render(painter, QRectF(), scene_rect)
+            
             painter.end()
             
             QMessageBox.information(self.main_window, "成功", f"流程图已成功导出为 {file_path}")
@@ -140,11 +254,18 @@ class ExportDialog(QDialog):
         self.resolution_spin.setSuffix(" DPI")
         form_layout.addRow("分辨率:", self.resolution_spin)
         
+        # 光栅PDF选项（仅对PDF格式有效）
+        self.raster_pdf_check = QCheckBox("光栅 PDF（高速）")
+        self.raster_pdf_check.setToolTip("先将流程图渲染为图片再写入PDF，复杂流程图导出更快，但不再是矢量图")
+        form_layout.addRow("PDF 模式:", self.raster_pdf_check)
+        
         # 背景颜色选择
         self.color_button = QPushButton("选择颜色")
         self.color_button.clicked.connect(self._choose_color)
         self.color_preview = QLabel()
         self.color_preview.setFixedSize(20, 20)
+        self.color_preview.setAutoFillBackground(True)
+        self.color_preview.setFrameShape(QFrame.Box)
         self._update_color_preview()
         
         color_layout = QHBoxLayout()
@@ -163,6 +284,7 @@ class ExportDialog(QDialog):
         
         # 连接信号
         self.format_combo.currentTextChanged.connect(self._update_ui)
+        self.raster_pdf_check.toggled.connect(self._update_ui)
         
         # 初始化UI状态
         self._update_ui()
@@ -171,8 +293,12 @@ class ExportDialog(QDialog):
         """根据当前选择更新UI状态"""
         is_image = self.format_combo.currentText() != "PDF"
         self.resolution_spin.setEnabled(is_image)
-        self.color_button.setEnabled(is_image)
-        self.color_preview.setEnabled(is_image)
+        self.raster_pdf_check.setEnabled(not is_image)
+        
+        # 光栅PDF同样需要背景颜色
+        use_color = is_image or self.raster_pdf_check.isChecked()
+        self.color_button.setEnabled(use_color)
+        self.color_preview.setEnabled(use_color)
     
     def _choose_color(self):
         """选择背景颜色"""
@@ -183,5 +309,6 @@ class ExportDialog(QDialog):
     
     def _update_color_preview(self):
         """更新颜色预览"""
-        style = f"background-color: {self.bg_color.name()}; border: 1px solid black;"
-        self.color_preview.setStyleSheet(style)
+        palette = self.color_preview.palette()
+        palette.setColor(QPalette.Window, self.bg_color)
+        self.color_preview.setPalette(palette)
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from functools import lru_cache
+
 from PyQt5.QtWidgets import (QAction, QFileDialog, QInputDialog, QMessageBox)
 from PyQt5.QtCore import Qt, QRectF, QPointF
-from PyQt5.QtGui import QPen, QBrush, QColor, QPainterPath, QPolygonF, QFont, QPixmap
+from PyQt5.QtGui import QPen, QBrush, QColor, QPainter, QPainterPath, QPolygonF, QFont, QFontMetrics, QPixmap
 
 # 扩展节点类型
 EXTENDED_NODE_TYPES = {
@@ -14,30 +16,58 @@ EXTENDED_NODE_TYPES = {
     "椭圆": {"shape": "ellipse", "color": QColor(221, 160, 221)},  # 梅红色
 }
 
-def extend_node_shape(node):
-    """扩展节点形状，用于碰撞检测"""
+# 节点边框画笔，只创建一次
+DEFAULT_NODE_PEN = QPen(Qt.black)
+DEFAULT_NODE_PEN.setWidth(2)
+SELECTED_NODE_PEN = QPen(Qt.red)
+SELECTED_NODE_PEN.setWidth(2)
+
+@lru_cache(maxsize=2)
+def node_font(is_title):
+    """节点文字字体（首次使用时创建，此时QApplication已存在）"""
+    font = QFont()
+    font.setPointSize(10)
+    if is_title:
+        font.setBold(True)
+        font.setPointSize(12)
+    return font
+
+@lru_cache(maxsize=2)
+def node_metrics(is_title=False):
+    """节点文字的字体度量，所有节点共用"""
+    return QFontMetrics(node_font(is_title))
+
+@lru_cache(maxsize=4096)
+def measure_node_text(text, is_title=False):
+    """根据文本计算节点的宽度和高度（相同文本只测量一次）"""
+    metrics = node_metrics(is_title)
+    width = metrics.horizontalAdvance(text) + 40  # 添加一些填充
+    height = metrics.height() * (1 + text.count('\n')) + 20
+    return max(120, width), max(40, height)  # 最小宽度和高度
+
+@lru_cache(maxsize=512)
+def _build_shape_path(shape_type, width, height):
+    """按形状类型和尺寸构建节点路径（结果被缓存，调用方不要修改返回值）"""
     path = QPainterPath()
     
-    if node.shape_type == "rounded_rect":
-        rect = QRectF(-node.width/2, -node.height/2, node.width, node.height)
+    if shape_type == "rounded_rect":
+        rect = QRectF(-width/2, -height/2, width, height)
         path.addRoundedRect(rect, 10, 10)  # 圆角矩形
-    elif node.shape_type == "cloud":
-        # 使用节点自己的云形状绘制方法
-        node._draw_cloud_path(path)
-    elif node.shape_type == "diamond":
+    elif shape_type == "diamond":
         # 菱形
         points = [
-            QPointF(0, -node.height/2),
-            QPointF(node.width/2, 0),
-            QPointF(0, node.height/2),
-            QPointF(-node.width/2, 0)
+            QPointF(0, -height/2),
+            QPointF(width/2, 0),
+            QPointF(0, height/2),
+            QPointF(-width/2, 0)
         ]
         polygon = QPolygonF(points)
         path.addPolygon(polygon)
-    elif node.shape_type == "hexagon":
+        path.closeSubpath()
+    elif shape_type == "hexagon":
         # 六边形
-        w = node.width/2
-        h = node.height/2
+        w = width/2
+        h = height/2
         points = [
             QPointF(-w/2, -h),
             QPointF(w/2, -h),
@@ -48,162 +78,163 @@ def extend_node_shape(node):
         ]
         polygon = QPolygonF(points)
         path.addPolygon(polygon)
-    elif node.shape_type == "parallelogram":
+        path.closeSubpath()
+    elif shape_type == "parallelogram":
         # 平行四边形
-        offset = node.width/4
+        offset = width/4
         points = [
-            QPointF(-node.width/2 + offset, -node.height/2),
-            QPointF(node.width/2 + offset, -node.height/2),
-            QPointF(node.width/2 - offset, node.height/2),
-            QPointF(-node.width/2 - offset, node.height/2)
+            QPointF(-width/2 + offset, -height/2),
+            QPointF(width/2 + offset, -height/2),
+            QPointF(width/2 - offset, height/2),
+            QPointF(-width/2 - offset, height/2)
         ]
         polygon = QPolygonF(points)
         path.addPolygon(polygon)
-    elif node.shape_type == "document":
+        path.closeSubpath()
+    elif shape_type == "document":
         # 文档形状（带卷曲底部的矩形）
-        path.moveTo(-node.width/2, -node.height/2)
-        path.lineTo(node.width/2, -node.height/2)
-        path.lineTo(node.width/2, node.height/2 - 10)
+        path.moveTo(-width/2, -height/2)
+        path.lineTo(width/2, -height/2)
+        path.lineTo(width/2, height/2 - 10)
         path.cubicTo(
-            node.width/3, node.height/2 - 5,
-            node.width/6, node.height/2 + 5,
-            -node.width/2, node.height/2
+            width/3, height/2 - 5,
+            width/6, height/2 + 5,
+            -width/2, height/2
         )
         path.closeSubpath()
-    elif node.shape_type == "ellipse":
+    elif shape_type == "ellipse":
         # 椭圆
-        path.addEllipse(QRectF(-node.width/2, -node.height/2, node.width, node.height))
+        path.addEllipse(QRectF(-width/2, -height/2, width, height))
     else:
         # 默认使用矩形
-        path.addRect(QRectF(-node.width/2, -node.height/2, node.width, node.height))
-        
+        path.addRect(QRectF(-width/2, -height/2, width, height))
+    
     return path
 
+def extend_node_shape(node):
+    """扩展节点形状，用于碰撞检测"""
+    if node.shape_type == "cloud":
+        # 复制节点缓存的云形状路径
+        return QPainterPath(node._get_cloud_path())
+    
+    # 复制缓存的路径模板，避免调用方修改缓存
+    return QPainterPath(_build_shape_path(node.shape_type, node.width, node.height))
+
 def extend_node_paint(node, painter, option, widget):
     """扩展节点绘制方法"""
-    # 设置画笔和画刷
-    pen = QPen(Qt.black)
-    pen.setWidth(2)
-    if node.isSelected():
-        pen.setColor(Qt.red)
-    
-    # 使用节点的渐变作为画刷
-    brush = QBrush(node.gradient)
+    # 需要重绘的区域与节点不相交时直接跳过
+    if not option.exposedRect.intersects(node.boundingRect()):
+        return
     
-    painter.setPen(pen)
-    painter.setBrush(brush)
+    # 设置画笔和画刷（使用预先创建的画笔，节点缓存的渐变作为画刷）
+    painter.setPen(SELECTED_NODE_PEN if node.isSelected() else DEFAULT_NODE_PEN)
+    painter.setBrush(node.fill_brush if node.fill_brush is not None else node.gradient_brush())
     
     # 根据形状绘制
     if node.shape_type == "rounded_rect":
         rect = QRectF(-node.width/2, -node.height/2, node.width, node.height)
         painter.drawRoundedRect(rect, 10, 10)  # 圆角矩形
-    elif node.shape_type == "cloud":
-        # 云形状由多个圆弧组成
-        path = QPainterPath()
-        node._draw_cloud_path(path)
-        painter.drawPath(path)
-    elif node.shape_type == "diamond":
-        # 菱形
-        points = [
-            QPointF(0, -node.height/2),
-            QPointF(node.width/2, 0),
-            QPointF(0, node.height/2),
-            QPointF(-node.width/2, 0)
-        ]
-        polygon = QPolygonF(points)
-        painter.drawPolygon(polygon)
-    elif node.shape_type == "hexagon":
-        # 六边形
-        w = node.width/2
-        h = node.height/2
-        points = [
-            QPointF(-w/2, -h),
-            QPointF(w/2, -h),
-            QPointF(w, 0),
-            QPointF(w/2, h),
-            QPointF(-w/2, h),
-            QPointF(-w, 0)
-        ]
-        polygon = QPolygonF(points)
-        painter.drawPolygon(polygon)
-    elif node.shape_type == "parallelogram":
-        # 平行四边形
-        offset = node.width/4
-        points = [
-            QPointF(-node.width/2 + offset, -node.height/2),
-            QPointF(node.width/2 + offset, -node.height/2),
-            QPointF(node.width/2 - offset, node.height/2),
-            QPointF(-node.width/2 - offset, node.height/2)
-        ]
-        polygon = QPolygonF(points)
-        painter.drawPolygon(polygon)
-    elif node.shape_type == "document":
-        # 文档形状（带卷曲底部的矩形）
-        path = QPainterPath()
-        path.moveTo(-node.width/2, -node.height/2)
-        path.lineTo(node.width/2, -node.height/2)
-        path.lineTo(node.width/2, node.height/2 - 10)
-        path.cubicTo(
-            node.width/3, node.height/2 - 5,
-            node.width/6, node.height/2 + 5,
-            -node.width/2, node.height/2
-        )
-        path.closeSubpath()
-        painter.drawPath(path)
     elif node.shape_type == "ellipse":
         # 椭圆
         painter.drawEllipse(QRectF(-node.width/2, -node.height/2, node.width, node.height))
+    elif node.shape_type == "cloud":
+        # 云形状由多个圆弧组成，使用节点缓存的路径
+        painter.drawPath(node._get_cloud_path())
     else:
-        # 默认使用矩形
-        painter.drawRect(QRectF(-node.width/2, -node.height/2, node.width, node.height))
+        # 其他形状直接绘制缓存的路径
+        painter.drawPath(_build_shape_path(node.shape_type, node.width, node.height))
     
     # 检查节点是否有图片
     if hasattr(node, 'image') and node.image is not None:
+        dpr = node.image.devicePixelRatio()
+        key = (node.width, node.height)
+        
+        # 节点变大后，之前按小尺寸缩小的图片不够清晰，从原图重新加载
+        loaded_w, loaded_h = getattr(node, 'image_size', key)
+        if getattr(node, 'image_path', None) and (node.width > loaded_w or node.height > loaded_h):
+            pixmap = _load_node_pixmap(node.image_path, node.width, node.height, dpr)
+            if pixmap is not None:
+                node.image = pixmap
+            node.image_size = key
+            node._scaled_image = None
+        
+        # 节点尺寸不变时复用已缩放的图片（按设备像素缩放，绘制时使用逻辑尺寸）
+        if getattr(node, '_scaled_image', None) is None or getattr(node, '_scaled_image_key', None) != key:
+            node._scaled_image = node.image.scaled(
+                int(node.width * 0.8 * dpr), 
+                int(node.height * 0.4 * dpr),
+                Qt.KeepAspectRatio,
+                Qt.SmoothTransformation
+            )
+            node._scaled_image.setDevicePixelRatio(dpr)
+            node._scaled_image_key = key
+        pixmap = node._scaled_image
+        pixmap_width = pixmap.width() / dpr
+        pixmap_height = pixmap.height() / dpr
+        
         # 绘制图片在节点顶部
-        pixmap = node.image.scaled(
-            int(node.width * 0.8), 
-            int(node.height * 0.4),
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
         painter.drawPixmap(
-            QPointF(-pixmap.width()/2, -node.height/2 + 5),
+            QPointF(-pixmap_width/2, -node.height/2 + 5),
             pixmap
         )
         
         # 调整文本区域
         text_rect = QRectF(
             -node.width/2 + 10, 
-            -node.height/2 + pixmap.height() + 10, 
+            -node.height/2 + pixmap_height + 10, 
             node.width - 20, 
-            node.height - pixmap.height() - 15
+            node.height - pixmap_height - 15
         )
     else:
         # 使用默认文本区域
         text_rect = QRectF(-node.width/2 + 10, -node.height/2 + 5, node.width - 20, node.height - 10)
     
     # 绘制文本
-    font = QFont()
-    font.setPointSize(10)
-    if node.node_type == "中心主题":
-        font.setBold(True)
-        font.setPointSize(12)
-    
-    painter.setFont(font)
+    painter.setFont(node_font(node.node_type == "中心主题"))
     painter.setPen(Qt.black)
     painter.drawText(text_rect, Qt.AlignCenter | Qt.TextWordWrap, node.node_text)
     
     # 检查节点是否有链接
     if hasattr(node, 'link') and node.link:
-        # 绘制链接图标
-        painter.setPen(Qt.blue)
-        link_rect = QRectF(
-            node.width/2 - 20, 
-            node.height/2 - 20, 
-            15, 
-            15
-        )
-        painter.drawText(link_rect, Qt.AlignCenter, "🔗")
+        # 绘制预先渲染好的链接图标
+        painter.drawPixmap(QPointF(node.width/2 - 20, node.height/2 - 20), _link_icon())
+
+@lru_cache(maxsize=1)
+def _link_icon():
+    """渲染链接图标（只渲染一次）"""
+    pixmap = QPixmap(15, 15)
+    pixmap.fill(Qt.transparent)
+    painter = QPainter(pixmap)
+    painter.setPen(Qt.blue)
+    painter.drawText(QRectF(0, 0, 15, 15), Qt.AlignCenter, "🔗")
+    painter.end()
+    return pixmap
+
+def _load_node_pixmap(file_path, width, height, device_pixel_ratio):
+    """加载图片，大图缩小到节点尺寸（按设备像素比计算），无法加载时返回None"""
+    pixmap = QPixmap(file_path)
+    if pixmap.isNull():
+        return None
+    
+    # 大图只保留节点能显示的大小，避免占用大量内存
+    max_width = int(width * device_pixel_ratio)
+    max_height = int(height * device_pixel_ratio)
+    if pixmap.width() > max_width or pixmap.height() > max_height:
+        pixmap = pixmap.scaled(max_width, max_height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    pixmap.setDevicePixelRatio(device_pixel_ratio)
+    return pixmap
+
+def set_node_image(node, file_path, device_pixel_ratio=1.0):
+    """加载图片并按节点显示尺寸缩小后保存到节点上，原图路径记录在image_path中，节点变大时据此重新加载"""
+    pixmap = _load_node_pixmap(file_path, node.width, node.height, device_pixel_ratio)
+    if pixmap is None:
+        raise ValueError("无法识别的图片格式")
+    
+    node.image = pixmap
+    node.image_path = file_path
+    node.image_size = (node.width, node.height)  # 加载图片时节点的尺寸
+    node._scaled_image = None
+    node.update()
 
 def extend_node_context_menu(node, event, main_window):
     """扩展节点右键菜单，添加图片和链接选项"""
@@ -243,8 +274,7 @@ def _add_image_to_node(node, main_window):
     
     if file_path:
         try:
-            node.image = QPixmap(file_path)
-            node.update()
+            set_node_image(node, file_path, main_window.devicePixelRatioF())
         except Exception as e:
             QMessageBox.critical(main_window, "错误", f"无法加载图片: {str(e)}")
 
@@ -252,6 +282,8 @@ def _remove_image_from_node(node):
     """从节点移除图片"""
     if hasattr(node, 'image'):
         node.image = None
+        node.image_path = None
+        node._scaled_image = None
         node.update()
 
 def _add_link_to_node(node, main_window):
@@ -5,6 +5,40 @@ import json
 from PyQt5.QtWidgets import QFileDialog, QMessageBox
 from PyQt5.QtGui import QColor
 
+from flowchart import get_item_types
+
+# 如果安装了orjson则使用更快的编码器
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 如果安装了msgpack则支持二进制格式
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# 保存时的缩进，None表示紧凑输出（文件更小、写入更快）
+SAVE_INDENT = None
+
+# 二进制格式（msgpack）的扩展名和文件头
+BINARY_EXT = '.flowb'
+BINARY_MAGIC = b'FLWB'
+
+def is_binary_flowchart(file_path):
+    """根据文件头判断是否为二进制格式的思维导图"""
+    with open(file_path, 'rb') as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+def load_binary_flowchart(file_path):
+    """读取二进制格式的思维导图"""
+    if msgpack is None:
+        raise RuntimeError("打开二进制格式需要安装msgpack")
+    with open(file_path, 'rb') as f:
+        f.seek(len(BINARY_MAGIC))
+        return msgpack.unpackb(f.read(), raw=False)
+
 def save_flowchart(editor):
     """保存思维导图"""
     if not editor.current_file:
@@ -18,37 +52,53 @@ def save_flowchart(editor):
         node_to_id = {}
         node_id = 0
         
-        # 收集节点数据
+        # 只遍历一次场景，收集节点数据并暂存连接线
+        node_cls, conn_cls = get_item_types(editor)
+        connections = []
         for item in editor.scene.items():
-            if hasattr(item, 'node_type'):  # 检查是否是FlowchartNode
+            if isinstance(item, node_cls):
                 node_id += 1
                 node_to_id[item] = str(node_id)
                 
+                pos = item.scenePos()
                 node_data = {
                     "id": str(node_id),
                     "type": item.node_type,
                     "text": item.node_text,
-                    "x": item.scenePos().x(),
-                    "y": item.scenePos().y(),
+                    "x": pos.x(),
+                    "y": pos.y(),
                     "color": item.color.name()
                 }
                 data["nodes"].append(node_data)
+            elif isinstance(item, conn_cls):
+                connections.append(item)
         
         # 收集连接数据
-        for item in editor.scene.items():
-            if hasattr(item, 'start_node') and hasattr(item, 'end_node'):  # 检查是否是FlowchartConnection
-                if item.start_node in node_to_id and item.end_node in node_to_id:
-                    conn_data = {
-                        "start": node_to_id[item.start_node],
-                        "end": node_to_id[item.end_node],
-                        "color": item.color.name(),
-                        "width": item.pen().width()
-                    }
-                    data["connections"].append(conn_data)
+        for item in connections:
+            if item.start_node in node_to_id and item.end_node in node_to_id:
+                conn_data = {
+                    "start": node_to_id[item.start_node],
+                    "end": node_to_id[item.end_node],
+                    "color": item.color.name(),
+                    "width": item.pen().width()
+                }
+                data["connections"].append(conn_data)
         
-        # 保存为JSON文件
-        with open(editor.current_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # 按扩展名选择保存格式
+        if editor.current_file.lower().endswith(BINARY_EXT):
+            if msgpack is None:
+                raise RuntimeError("保存二进制格式需要安装msgpack")
+            with open(editor.current_file, 'wb') as f:
+                f.write(BINARY_MAGIC)
+                f.write(msgpack.packb(data, use_bin_type=True))
+        elif orjson is not None:
+            option = orjson.OPT_INDENT_2 if SAVE_INDENT else 0
+            with open(editor.current_file, 'wb') as f:
+                f.write(orjson.dumps(data, option=option))
+        else:
+            separators = None if SAVE_INDENT else (',', ':')
+            with open(editor.current_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=SAVE_INDENT, ensure_ascii=False, separators=separators)
         
         # 重置修改状态
         editor.setModified(False)
@@ -62,14 +112,21 @@ def save_flowchart(editor):
 
 def save_flowchart_as(editor):
     """思维导图另存为"""
-    file_path, _ = QFileDialog.getSaveFileName(
-        editor, "思维导图另存为", "", "思维导图文件 (*.flow);;所有文件 (*)")
+    file_filter = "思维导图文件 (*.flow)"
+    binary_filter = f"二进制思维导图 (*{BINARY_EXT})"
+    if msgpack is not None:
+        file_filter += ";;" + binary_filter
+    file_path, selected_filter = QFileDialog.getSaveFileName(
+        editor, "思维导图另存为", "", file_filter + ";;所有文件 (*)")
     
     if not file_path:
         return False
     
     # 确保文件扩展名
-    if not file_path.endswith('.flow'):
+    if selected_filter == binary_filter:
+        if not file_path.endswith(BINARY_EXT):
+            file_path += BINARY_EXT
+    elif not file_path.endswith(('.flow', BINARY_EXT)):
         file_path += '.flow'
     
     editor.current_file = file_path
@@ -5,141 +5,427 @@ import os
 import sys
 import time
 import json
+import re
+import fnmatch
 import datetime
-import platform
 import subprocess
+import threading
+from collections import deque, OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, as_completed
 from pathlib import Path
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QTableWidget, QTableWidgetItem,
                              QVBoxLayout, QHBoxLayout, QWidget, QLabel, QLineEdit,
                              QPushButton, QFileDialog, QMenu, QAction, QHeaderView,
                              QComboBox, QCheckBox, QMessageBox, QProgressBar, QSizePolicy,
-                             QGroupBox, QFormLayout, QSpinBox, QInputDialog, QDialog)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize, QTimer
+                             QGroupBox, QFormLayout, QSpinBox, QInputDialog, QDialog,
+                             QTableView, QAbstractItemView)
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QSize, QTimer, QAbstractTableModel,
+                          QModelIndex, QSortFilterProxyModel, QRunnable, QThreadPool)
 from PyQt5.QtGui import QIcon, QCursor
 
+# 如果安装了orjson则使用更快的编码器
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@lru_cache(maxsize=4096)
+def _format_seconds(seconds):
+    """格式化整秒时间戳（同一秒内修改的文件很多，结果缓存）"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(seconds))
+
+
+def format_timestamp(timestamp):
+    """将时间戳格式化为 年-月-日 时:分:秒"""
+    return _format_seconds(int(timestamp))
+
+
+# 文件类型下拉框中各预设类型对应的扩展名
+FILE_TYPE_EXTENSIONS = {
+    1: frozenset(("txt", "doc", "docx", "pdf", "rtf")),  # 文档
+    2: frozenset(("jpg", "jpeg", "png", "gif", "bmp")),  # 图片
+    3: frozenset(("mp3", "wav", "flac", "ogg")),  # 音频
+    4: frozenset(("mp4", "avi", "mkv", "mov")),  # 视频
+    5: frozenset(("zip", "rar", "7z", "tar", "gz")),  # 压缩文件
+}
+
+# 运行平台，只在启动时判断一次
+IS_WINDOWS = sys.platform == 'win32'
+IS_MACOS = sys.platform == 'darwin'
+
+
+# 从stat结果中获取文件创建时间
+if IS_WINDOWS:
+    def get_created_time(stat):
+        return stat.st_ctime
+else:
+    def get_created_time(stat):
+        # macOS有st_birthtime，Linux可能没有创建时间
+        return getattr(stat, 'st_birthtime', stat.st_mtime)
+
+
+# 历史记录文件
+HISTORY_FILE = os.path.join(os.path.expanduser("~"), ".file_searcher_history.json")
+_history_write_lock = threading.Lock()
+
+
+def write_history_file(data):
+    """序列化历史记录，先写入临时文件再替换，避免写到一半时损坏原文件"""
+    if orjson is not None:
+        content = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        content = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    
+    with _history_write_lock:
+        tmp_file = HISTORY_FILE + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, HISTORY_FILE)
+
+
+class HistoryWriter(QRunnable):
+    """在线程池中写入历史记录，不阻塞界面"""
+    
+    def __init__(self, data):
+        super().__init__()
+        self.data = data
+    
+    def run(self):
+        try:
+            write_history_file(self.data)
+        except Exception as e:
+            print(f"保存历史记录失败: {e}")
+
+
+# 各单位的除数和名称
+_SIZE_UNITS = ((1, "B"), (1 << 10, "KB"), (1 << 20, "MB"), (1 << 30, "GB"))
+
+
+def format_size(size_bytes):
+    # 格式化文件大小，单位都是1024的幂，直接由二进制位数确定单位
+    unit = min(max(size_bytes.bit_length() - 1, 0) // 10, 3)
+    if unit == 0:
+        return f"{size_bytes} B"
+    divisor, suffix = _SIZE_UNITS[unit]
+    return f"{size_bytes / divisor:.2f} {suffix}"
+
+
+class FileResultsModel(QAbstractTableModel):
+    """搜索结果表格模型，每列数据分别存放在一个列表中，显示文本在需要时才格式化"""
+    HEADERS = ["文件名", "路径", "类型", "大小", "创建时间", "修改时间", "完整路径"]
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.paths = []
+        self.names = []
+        self.types = []
+        self.sizes = []
+        self.ctimes = []
+        self.mtimes = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        row, column = index.row(), index.column()
+        if column in (3, 4, 5) and self.sizes[row] is None:
+            self.load_stat(row)
+        
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return self.names[row]
+            elif column == 1:
+                return os.path.dirname(self.paths[row])
+            elif column == 2:
+                return self.types[row]
+            elif column == 3:
+                return format_size(self.sizes[row])
+            elif column == 4:
+                return format_timestamp(self.ctimes[row])
+            elif column == 5:
+                return format_timestamp(self.mtimes[row])
+            elif column == 6:
+                return self.paths[row]
+        elif role == Qt.UserRole:
+            # 排序使用原始数值，而不是格式化后的文本
+            if column == 3:
+                return self.sizes[row]
+            elif column == 4:
+                return self.ctimes[row]
+            elif column == 5:
+                return self.mtimes[row]
+            return self.data(index, Qt.DisplayRole)
+        return None
+    
+    def load_stat(self, row):
+        """搜索时没有获取大小和时间的行，在第一次显示时再读取"""
+        try:
+            stat = os.stat(self.paths[row], follow_symlinks=False)
+            self.sizes[row] = stat.st_size
+            self.ctimes[row] = get_created_time(stat)
+            self.mtimes[row] = stat.st_mtime
+        except OSError:
+            self.sizes[row] = 0
+            self.ctimes[row] = self.mtimes[row] = 0
+    
+    def append_rows(self, batch):
+        """追加一批搜索结果"""
+        if not batch:
+            return
+        
+        first = len(self.paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        for full_path, file_name, ext, file_size, created_time, modified_time, file_type in batch:
+            self.paths.append(full_path)
+            self.names.append(file_name)
+            self.types.append(file_type)
+            self.sizes.append(file_size)
+            self.ctimes.append(created_time)
+            self.mtimes.append(modified_time)
+        self.endInsertRows()
+    
+    def remove_row(self, row):
+        """移除一行"""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        for column in (self.paths, self.names, self.types, self.sizes, self.ctimes, self.mtimes):
+            del column[row]
+        self.endRemoveRows()
+    
+    def clear(self):
+        """清空所有结果"""
+        self.beginResetModel()
+        for column in (self.paths, self.names, self.types, self.sizes, self.ctimes, self.mtimes):
+            column.clear()
+        self.endResetModel()
+
 
 class FileSearchThread(QThread):
     """文件搜索线程"""
     # 定义信号
-    file_found = pyqtSignal(str, str, str, int, str, str, str)  # 文件路径, 文件名, 后缀, 大小, 创建时间, 修改时间, 文件类型
+    files_found = pyqtSignal(list)  # 批量找到的文件，元素为(文件路径, 文件名, 后缀, 大小, 创建时间戳, 修改时间戳, 文件类型)
     search_completed = pyqtSignal(int)  # 搜索完成信号，参数为找到的文件数量
     search_progress = pyqtSignal(int, int)  # 搜索进度信号，参数为当前进度和总进度
+    errors_collected = pyqtSignal(list, int)  # 搜索结束时发送，参数为最近的错误列表[(路径, 错误信息)]和错误总数
     
-    def __init__(self, search_path, search_term, file_extensions, min_size, max_size, search_subdirs):
+    def __init__(self, search_path, search_term, file_extensions, min_size, max_size, search_subdirs,
+                 use_wildcard=False):
         super().__init__()
         self.search_path = search_path
-        self.search_term = search_term.lower()  # 转为小写以便不区分大小写搜索
-        self.file_extensions = file_extensions
+        self.search_term = search_term
+        self.file_extensions = frozenset(file_extensions or ())
         self.min_size = min_size
         self.max_size = max_size
+        
+        # 预先计算过滤条件，避免在每个文件上重复计算
+        self.min_bytes = min_size * 1024 if min_size > 0 else 0
+        self.max_bytes = max_size * 1024 if max_size > 0 else 0
+        # Windows上scandir已经带回了大小和时间，entry.stat()不产生额外的系统调用，总是在扫描时读取
+        self.stat_during_scan = IS_WINDOWS or bool(self.min_bytes or self.max_bytes)
+        # 只有用户选择了通配符匹配时才把*?[当作通配符，否则按普通文字查找（例如report[1]）
+        is_wildcard = use_wildcard and any(c in self.search_term for c in '*?[')
+        if is_wildcard:
+            # 按通配符模式匹配整个文件名
+            self.match_name = re.compile(fnmatch.translate(self.search_term), re.IGNORECASE).match
+        elif self.search_term:
+            # casefold比lower更适合不区分大小写的比较
+            self.match_name = lambda name, term=self.search_term.casefold(): term in name.casefold()
+        else:
+            self.match_name = None
+        
+        # 同时按扩展名和搜索词过滤时合并为一个正则，不符合条件的文件只需匹配一次
+        self.match_filters = None
+        if self.file_extensions and self.match_name is not None and "" not in self.file_extensions:
+            if is_wildcard:
+                name_pattern = fnmatch.translate(self.search_term)
+                ext_pattern = "|".join(re.escape(ext) for ext in sorted(self.file_extensions))
+                self.match_filters = re.compile(
+                    f"(?=(?s:{name_pattern}))(?s:.+)\\.(?:{ext_pattern})\\Z", re.IGNORECASE
+                ).match
+            else:
+                # 普通查找与match_name一样按casefold比较，有无文件类型过滤时匹配结果一致（例如straße与STRASSE）
+                name_pattern = ".*" + re.escape(self.search_term.casefold())
+                ext_pattern = "|".join(re.escape(ext.casefold()) for ext in sorted(self.file_extensions))
+                match_folded = re.compile(
+                    f"(?=(?s:{name_pattern}))(?s:.+)\\.(?:{ext_pattern})\\Z"
+                ).match
+                self.match_filters = lambda name: match_folded(name.casefold())
         self.search_subdirs = search_subdirs
         self.running = True
         self.file_count = 0
         self.dirs_to_scan = 0
         self.dirs_scanned = 0
+        self.lock = threading.Lock()  # 保护多个工作线程共享的计数
+        self.split_threshold = 4  # 子目录数超过该值时才分发给其他工作线程
+        self.batch_size = 256  # 每批发送的文件数
+        self.batch_interval = 0.05  # 未攒满一批时最长的发送间隔（秒）
+        self.type_labels = {}  # 扩展名 -> 文件类型文字
+        self.errors = deque(maxlen=256)  # 只保留最近的错误，避免在搜索过程中输出
+        self.error_count = 0
     
     def run(self):
-        # 计算需要扫描的目录数量
-        if self.search_subdirs:
-            for _, dirs, _ in os.walk(self.search_path):
-                self.dirs_to_scan += 1
-                if self.dirs_to_scan > 1000:  # 限制目录计数，避免过长时间
-                    break
-        else:
-            self.dirs_to_scan = 1
+        # 需要扫描的目录总数在搜索过程中随发现的子目录逐步增加，避免预先遍历整棵目录树
+        self.dirs_to_scan = 1
         
         # 开始搜索
         self.search_files(self.search_path)
+        self.errors_collected.emit(list(self.errors), self.error_count)
         self.search_completed.emit(self.file_count)
     
     def search_files(self, directory):
-        try:
-            # 获取目录中的所有文件和子目录
-            items = os.listdir(directory)
-            
-            # 更新进度
-            self.dirs_scanned += 1
-            self.search_progress.emit(self.dirs_scanned, self.dirs_to_scan)
+        # 使用线程池并发扫描多个目录，文件系统调用的等待时间可以相互重叠
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self.scan_tree, directory)}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # 工作线程交回的子目录分发给其他线程继续扫描
+                    for sub_directory in future.result():
+                        if self.running:
+                            futures.add(pool.submit(self.scan_tree, sub_directory))
+    
+    def scan_tree(self, directory):
+        """在工作线程中扫描目录，返回需要分发给其他线程的子目录"""
+        # 子目录较少时留在当前线程继续扫描，避免为小目录树付出调度开销
+        pending = deque([directory])
+        to_dispatch = []
+        
+        # 找到的文件攒成一批再发送，减少跨线程信号的数量
+        batch = []
+        last_flush = time.monotonic()
+        
+        while pending and self.running:
+            directory = pending.popleft()
+            sub_directories = []
             
-            for item in items:
-                if not self.running:  # 检查是否应该停止
-                    return
-                
-                full_path = os.path.join(directory, item)
-                
-                # 如果是文件
-                if os.path.isfile(full_path):
-                    # 检查文件名是否匹配搜索词
-                    if self.search_term and self.search_term not in item.lower():
-                        continue
-                    
-                    # 检查文件扩展名
-                    _, ext = os.path.splitext(item)
-                    ext = ext.lower()[1:]  # 移除点号并转为小写
-                    
-                    if self.file_extensions and ext not in self.file_extensions:
-                        continue
-                    
-                    # 获取文件大小
-                    try:
-                        file_size = os.path.getsize(full_path)
-                        
-                        # 检查文件大小范围
-                        if (self.min_size > 0 and file_size < self.min_size * 1024) or \
-                           (self.max_size > 0 and file_size > self.max_size * 1024):
-                            continue
-                        
-                        # 获取文件创建和修改时间
-                        if platform.system() == 'Windows':
-                            created_time = os.path.getctime(full_path)
-                        else:
-                            try:
-                                stat = os.stat(full_path)
-                                created_time = stat.st_birthtime  # macOS
-                            except AttributeError:
-                                created_time = stat.st_mtime  # Linux可能没有创建时间
-                        
-                        modified_time = os.path.getmtime(full_path)
-                        
-                        # 格式化时间
-                        created_time_str = datetime.datetime.fromtimestamp(created_time).strftime('%Y-%m-%d %H:%M:%S')
-                        modified_time_str = datetime.datetime.fromtimestamp(modified_time).strftime('%Y-%m-%d %H:%M:%S')
-                        
-                        # 确定文件类型
-                        file_type = "未知"
-                        if ext:
-                            file_type = f"{ext.upper()} 文件"
-                        else:
-                            file_type = "无扩展名文件"
+            try:
+                # 使用scandir遍历目录，DirEntry自带文件类型和缓存的stat信息
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if not self.running:  # 检查是否应该停止
+                            return []
                         
-                        # 发出文件找到信号
-                        self.file_found.emit(
-                            full_path,
-                            item,
-                            ext,
-                            file_size,
-                            created_time_str,
-                            modified_time_str,
-                            file_type
-                        )
+                        # 如果是文件
+                        if entry.is_file(follow_symlinks=False):
+                            result = self.process_file(entry)
+                            if result is None:
+                                continue
+                            
+                            batch.append(result)
+                            now = time.monotonic()
+                            if len(batch) >= self.batch_size or now - last_flush >= self.batch_interval:
+                                self.files_found.emit(batch)
+                                batch = []
+                                last_flush = now
                         
-                        self.file_count += 1
-                    except Exception as e:
-                        print(f"处理文件 {full_path} 时出错: {e}")
-                
-                # 如果是目录且需要搜索子目录
-                elif os.path.isdir(full_path) and self.search_subdirs:
-                    try:
-                        self.search_files(full_path)
-                    except PermissionError:
-                        print(f"无权限访问目录: {full_path}")
-                    except Exception as e:
-                        print(f"搜索目录 {full_path} 时出错: {e}")
+                        # 如果是目录且需要搜索子目录
+                        elif self.search_subdirs and entry.is_dir(follow_symlinks=False):
+                            sub_directories.append(entry.path)
+            
+            except PermissionError:
+                self.record_error(directory, "无权限访问目录")
+            except Exception as e:
+                self.record_error(directory, f"搜索目录时出错: {e}")
+            
+            # 更新进度，总数随发现的子目录增加
+            with self.lock:
+                self.dirs_scanned += 1
+                self.dirs_to_scan += len(sub_directories)
+                scanned, total = self.dirs_scanned, self.dirs_to_scan
+            self.search_progress.emit(scanned, total)
+            
+            if len(sub_directories) > self.split_threshold:
+                to_dispatch.extend(sub_directories)
+            else:
+                pending.extend(sub_directories)
+        
+        # 发送剩余的文件
+        if batch:
+            self.files_found.emit(batch)
+        
+        return to_dispatch
+    
+    def process_file(self, entry):
+        """检查单个文件是否符合搜索条件，符合则返回文件信息元组，否则返回None"""
+        item = entry.name
+        full_path = entry.path
+        
+        if self.match_filters is not None:
+            # 扩展名和搜索词一次检查完，匹配成功时文件一定有扩展名
+            if not self.match_filters(item):
+                return
+            ext = item.rpartition('.')[2].lower()
+        else:
+            # 检查文件扩展名（移除点号并转为小写），集合查找比名称匹配更快，先检查
+            base, dot, ext = item.rpartition('.')
+            ext = ext.lower() if dot and base else ""
+            
+            if self.file_extensions and ext not in self.file_extensions:
+                return
+            
+            # 检查文件名是否匹配搜索词
+            if self.match_name is not None and not self.match_name(item):
+                return
         
-        except PermissionError:
-            print(f"无权限访问目录: {directory}")
+        try:
+            if self.stat_during_scan:
+                # 只调用一次stat，大小和时间都从中读取
+                stat = entry.stat(follow_symlinks=False)
+                file_size = stat.st_size
+                
+                # 检查文件大小范围
+                if (self.min_bytes and file_size < self.min_bytes) or \
+                   (self.max_bytes and file_size > self.max_bytes):
+                    return
+                
+                # 获取文件创建和修改时间
+                created_time = get_created_time(stat)
+                modified_time = stat.st_mtime
+            else:
+                # 其他平台不按大小过滤时不调用stat，由表格模型在显示时再获取
+                file_size = created_time = modified_time = None
+            
+            # 确定文件类型（同一扩展名的文字只生成一次）
+            file_type = self.type_labels.get(ext)
+            if file_type is None:
+                file_type = self.type_labels.setdefault(ext, f"{ext.upper()} 文件" if ext else "无扩展名文件")
+            
+            with self.lock:
+                self.file_count += 1
+            
+            return (
+                full_path,
+                item,
+                ext,
+                file_size,
+                created_time,
+                modified_time,
+                file_type
+            )
         except Exception as e:
-            print(f"搜索目录 {directory} 时出错: {e}")
+            self.record_error(full_path, f"处理文件时出错: {e}")
+            return None
+    
+    def record_error(self, path, message):
+        """记录搜索过程中的错误"""
+        with self.lock:
+            self.errors.append((path, message))
+            self.error_count += 1
     
     def stop(self):
         self.running = False
@@ -156,10 +442,14 @@ class FileSearcher(QMainWindow):
         self.setCentralWidget(self.central_widget)
         self.main_layout = QVBoxLayout(self.central_widget)
         
-        # 初始化历史记录
-        self.search_history = []
+        # 初始化历史记录（搜索历史以(路径, 关键词)为键，最新的在最前面）
+        self.search_history = OrderedDict()
         self.delete_history = []
         
+        # 最近一次搜索的错误信息
+        self.search_errors = []
+        self.search_error_count = 0
+        
         # 创建搜索控件
         self.create_search_controls()
         
@@ -176,6 +466,13 @@ class FileSearcher(QMainWindow):
         self.search_timer = QTimer()
         self.search_timer.timeout.connect(self.update_search_time)
         self.search_start_time = 0
+        self.last_time_text = ""
+        
+        # 历史记录延迟保存，2秒内的多次修改合并为一次写入
+        self.history_save_timer = QTimer()
+        self.history_save_timer.setSingleShot(True)
+        self.history_save_timer.setInterval(2000)
+        self.history_save_timer.timeout.connect(self.flush_history)
         
         # 加载历史记录
         self.load_history_from_file()
@@ -261,6 +558,11 @@ class FileSearcher(QMainWindow):
         self.subdirs_check.setChecked(True)
         advanced_layout.addWidget(self.subdirs_check)
         
+        # 通配符匹配选项，选中后搜索词中的*?[]按通配符处理并匹配整个文件名
+        self.wildcard_check = QCheckBox("通配符匹配")
+        self.wildcard_check.setToolTip("选中后搜索词按通配符匹配整个文件名，例如 *.log、report_??.txt")
+        advanced_layout.addWidget(self.wildcard_check)
+        
         # 添加搜索按钮
         self.search_button = QPushButton("开始搜索")
         self.search_button.clicked.connect(self.start_search)
@@ -311,6 +613,12 @@ class FileSearcher(QMainWindow):
         self.delete_button.setEnabled(False)  # 初始时禁用
         results_button_layout.addWidget(self.delete_button)
         
+        # 添加查看搜索错误按钮
+        self.view_errors_button = QPushButton("查看错误")
+        self.view_errors_button.clicked.connect(self.show_search_errors)
+        self.view_errors_button.setEnabled(False)  # 有错误时才启用
+        results_button_layout.addWidget(self.view_errors_button)
+        
         # 添加查看删除记录按钮
         self.view_delete_history_button = QPushButton("查看删除记录")
         self.view_delete_history_button.clicked.connect(self.show_delete_history)
@@ -318,9 +626,17 @@ class FileSearcher(QMainWindow):
         
         table_layout.addLayout(results_button_layout)
         
-        # 创建表格
-        self.table = QTableWidget(0, 7)
-        self.table.setHorizontalHeaderLabels(["文件名", "路径", "类型", "大小", "创建时间", "修改时间", "完整路径"])
+        # 创建表格，数据存放在模型中，通过代理模型排序
+        self.model = FileResultsModel(self)
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.setSortRole(Qt.UserRole)
+        
+        self.table = QTableView()
+        self.table.setModel(self.proxy_model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(-1, Qt.AscendingOrder)  # 默认保持搜索到的顺序
         
         # 设置表格列宽
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)  # 文件名列自适应
@@ -338,10 +654,10 @@ class FileSearcher(QMainWindow):
         self.table.customContextMenuRequested.connect(self.show_context_menu)
         
         # 双击打开文件
-        self.table.cellDoubleClicked.connect(self.open_file)
+        self.table.doubleClicked.connect(lambda index: self.open_file(index.row(), index.column()))
         
         # 连接选中变化信号
-        self.table.itemSelectionChanged.connect(self.update_delete_button_state)
+        self.table.selectionModel().selectionChanged.connect(self.update_delete_button_state)
         
         table_layout.addWidget(self.table)
         
@@ -369,16 +685,8 @@ class FileSearcher(QMainWindow):
         file_type_index = self.file_type_combo.currentIndex()
         file_type_text = self.file_type_combo.currentText()
         
-        if file_type_index == 1:  # 文档
-            file_extensions = ["txt", "doc", "docx", "pdf", "rtf"]
-        elif file_type_index == 2:  # 图片
-            file_extensions = ["jpg", "jpeg", "png", "gif", "bmp"]
-        elif file_type_index == 3:  # 音频
-            file_extensions = ["mp3", "wav", "flac", "ogg"]
-        elif file_type_index == 4:  # 视频
-            file_extensions = ["mp4", "avi", "mkv", "mov"]
-        elif file_type_index == 5:  # 压缩文件
-            file_extensions = ["zip", "rar", "7z", "tar", "gz"]
+        if file_type_index in FILE_TYPE_EXTENSIONS:
+            file_extensions = FILE_TYPE_EXTENSIONS[file_type_index]
         elif file_type_index == 6:  # 自定义
             custom_extensions, ok = QInputDialog.getText(self, "自定义文件类型", 
                                                     "输入文件扩展名（用逗号分隔，不含点号）:")
@@ -393,9 +701,11 @@ class FileSearcher(QMainWindow):
         
         # 获取是否搜索子目录
         search_subdirs = self.subdirs_check.isChecked()
+        use_wildcard = self.wildcard_check.isChecked()
         
-        # 清空表格
-        self.table.setRowCount(0)
+        # 清空表格和上次的错误信息
+        self.model.clear()
+        self.set_search_errors([], 0)
         self.results_label.setText("找到 0 个文件")
         
         # 更新UI状态
@@ -408,8 +718,8 @@ class FileSearcher(QMainWindow):
         self.progress_bar.setMaximum(100)  # 临时设置
         
         # 开始计时
-        self.search_start_time = time.time()
-        self.search_timer.start(1000)  # 每秒更新一次
+        self.search_start_time = time.monotonic()
+        self.search_timer.start(500)  # 开始时每0.5秒更新一次，长时间搜索后降低频率
         
         # 记录搜索历史
         search_record = {
@@ -422,47 +732,25 @@ class FileSearcher(QMainWindow):
         
         # 创建并启动搜索线程
         self.search_thread = FileSearchThread(
-            search_path, search_term, file_extensions, min_size, max_size, search_subdirs)
-        self.search_thread.file_found.connect(self.add_file_to_table)
+            search_path, search_term, file_extensions, min_size, max_size, search_subdirs, use_wildcard)
+        self.search_thread.files_found.connect(self.add_files_to_table)
         self.search_thread.search_completed.connect(self.search_finished)
         self.search_thread.search_progress.connect(self.update_progress)
+        self.search_thread.errors_collected.connect(self.set_search_errors)
         self.search_thread.start()
     
     def stop_search(self):
         if self.search_thread and self.search_thread.isRunning():
             self.search_thread.stop()
             self.search_thread.wait()  # 等待线程结束
-            self.search_finished(self.table.rowCount())
+            self.search_finished(self.model.rowCount())
     
-    def add_file_to_table(self, full_path, file_name, ext, file_size, created_time, modified_time, file_type):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        
-        # 设置文件名
-        self.table.setItem(row, 0, QTableWidgetItem(file_name))
-        
-        # 设置文件路径（显示相对路径）
-        dir_path = os.path.dirname(full_path)
-        self.table.setItem(row, 1, QTableWidgetItem(dir_path))
-        
-        # 设置文件类型
-        self.table.setItem(row, 2, QTableWidgetItem(file_type))
-        
-        # 设置文件大小（格式化）
-        size_str = self.format_size(file_size)
-        self.table.setItem(row, 3, QTableWidgetItem(size_str))
-        
-        # 设置创建时间
-        self.table.setItem(row, 4, QTableWidgetItem(created_time))
-        
-        # 设置修改时间
-        self.table.setItem(row, 5, QTableWidgetItem(modified_time))
-        
-        # 存储完整路径（隐藏列）
-        self.table.setItem(row, 6, QTableWidgetItem(full_path))
+    def add_files_to_table(self, batch):
+        """将一批搜索结果添加到表格中"""
+        self.model.append_rows(batch)
         
         # 更新结果计数
-        self.results_label.setText(f"找到 {row + 1} 个文件")
+        self.results_label.setText(f"找到 {self.model.rowCount()} 个文件")
     
     def search_finished(self, count):
         # 停止计时器
@@ -473,7 +761,7 @@ class FileSearcher(QMainWindow):
         self.stop_button.setEnabled(False)
         
         # 更新状态栏
-        elapsed_time = time.time() - self.search_start_time
+        elapsed_time = time.monotonic() - self.search_start_time
         self.statusBar().showMessage(f'搜索完成，找到 {count} 个文件，用时 {self.format_time(elapsed_time)}')
         
         # 更新进度条
@@ -485,8 +773,17 @@ class FileSearcher(QMainWindow):
             self.progress_bar.setValue(current)
     
     def update_search_time(self):
-        elapsed_time = time.time() - self.search_start_time
-        self.time_label.setText(f"时间: {self.format_time(elapsed_time)}")
+        elapsed_time = time.monotonic() - self.search_start_time
+        
+        # 搜索超过一分钟后改为每2秒更新一次，减少唤醒次数
+        if elapsed_time > 60 and self.search_timer.interval() < 2000:
+            self.search_timer.setInterval(2000)
+        
+        # 显示内容没有变化时不重新设置文字，避免多余的重绘
+        text = f"时间: {self.format_time(elapsed_time)}"
+        if text != self.last_time_text:
+            self.last_time_text = text
+            self.time_label.setText(text)
     
     def show_context_menu(self, position):
         # 获取当前选中的行
@@ -521,13 +818,17 @@ class FileSearcher(QMainWindow):
     
     def update_delete_button_state(self):
         # 更新删除按钮状态
-        selected_items = self.table.selectedItems()
-        self.delete_button.setEnabled(len(selected_items) > 0)
+        self.delete_button.setEnabled(self.table.selectionModel().hasSelection())
+    
+    def source_row(self, row):
+        """将表格中显示的行号（可能已排序）转换为模型中的行号"""
+        return self.proxy_model.mapToSource(self.proxy_model.index(row, 0)).row()
     
     def delete_file(self, row):
         # 获取文件路径
-        file_path = self.table.item(row, 6).text()
-        file_name = self.table.item(row, 0).text()
+        row = self.source_row(row)
+        file_path = self.model.paths[row]
+        file_name = self.model.names[row]
         
         # 确认删除
         reply = QMessageBox.question(self, "确认删除", 
@@ -549,10 +850,10 @@ class FileSearcher(QMainWindow):
                 self.save_history_to_file()  # 保存历史记录
                 
                 # 从表格中移除
-                self.table.removeRow(row)
+                self.model.remove_row(row)
                 
                 # 更新结果计数
-                count = self.table.rowCount()
+                count = self.model.rowCount()
                 self.results_label.setText(f"找到 {count} 个文件")
                 
                 # 显示成功消息
@@ -562,9 +863,9 @@ class FileSearcher(QMainWindow):
     
     def delete_selected_files(self):
         # 获取选中的行
-        selected_rows = set()
-        for item in self.table.selectedItems():
-            selected_rows.add(item.row())
+        selected_rows = frozenset(
+            self.source_row(index.row()) for index in self.table.selectionModel().selectedRows()
+        )
         
         if not selected_rows:
             return
@@ -576,36 +877,43 @@ class FileSearcher(QMainWindow):
                                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if reply == QMessageBox.Yes:
-            # 从大到小排序行号，以避免删除时索引变化
-            rows = sorted(list(selected_rows), reverse=True)
-            deleted_count = 0
+            # 一次取出所有待删除文件的信息，行号从大到小排序，以避免删除时索引变化
+            targets = [(row, self.model.names[row], self.model.paths[row])
+                       for row in sorted(selected_rows, reverse=True)]
+            deleted_rows = []
             failed_files = []
             
-            for row in rows:
-                try:
-                    # 获取文件路径
-                    file_path = self.table.item(row, 6).text()
-                    file_name = self.table.item(row, 0).text()
-                    
-                    # 删除文件
-                    os.remove(file_path)
+            # 删除文件是IO操作，在线程池中并发执行
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                futures = {executor.submit(os.remove, file_path): (row, file_name, file_path)
+                           for row, file_name, file_path in targets}
+                for future in as_completed(futures):
+                    row, file_name, file_path = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failed_files.append((file_name, str(e)))
+                        continue
                     
                     # 记录删除操作
-                    delete_record = {
+                    self.delete_history.append({
                         "file_name": file_name,
                         "file_path": file_path,
                         "time": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                    self.delete_history.append(delete_record)
-                    
-                    # 从表格中移除
-                    self.table.removeRow(row)
-                    deleted_count += 1
-                except Exception as e:
-                    failed_files.append((self.table.item(row, 0).text(), str(e)))
+                    })
+                    deleted_rows.append(row)
+            
+            # 从表格中移除，仍按行号从大到小进行
+            self.table.setUpdatesEnabled(False)
+            try:
+                for row in sorted(deleted_rows, reverse=True):
+                    self.model.remove_row(row)
+            finally:
+                self.table.setUpdatesEnabled(True)
+            deleted_count = len(deleted_rows)
             
             # 更新结果计数
-            count = self.table.rowCount()
+            count = self.model.rowCount()
             self.results_label.setText(f"找到 {count} 个文件")
             
             # 显示结果消息
@@ -628,13 +936,13 @@ class FileSearcher(QMainWindow):
     
     def open_file(self, row, column):
         # 获取文件路径
-        file_path = self.table.item(row, 6).text()
+        file_path = self.model.paths[self.source_row(row)]
         
         # 根据操作系统打开文件
         try:
-            if platform.system() == 'Windows':
+            if IS_WINDOWS:
                 os.startfile(file_path)
-            elif platform.system() == 'Darwin':  # macOS
+            elif IS_MACOS:
                 subprocess.call(['open', file_path])
             else:  # Linux
                 subprocess.call(['xdg-open', file_path])
@@ -643,14 +951,14 @@ class FileSearcher(QMainWindow):
     
     def open_folder(self, row):
         # 获取文件路径
-        file_path = self.table.item(row, 6).text()
+        file_path = self.model.paths[self.source_row(row)]
         folder_path = os.path.dirname(file_path)
         
         # 根据操作系统打开文件夹
         try:
-            if platform.system() == 'Windows':
+            if IS_WINDOWS:
                 os.startfile(folder_path)
-            elif platform.system() == 'Darwin':  # macOS
+            elif IS_MACOS:
                 subprocess.call(['open', folder_path])
             else:  # Linux
                 subprocess.call(['xdg-open', folder_path])
@@ -659,7 +967,7 @@ class FileSearcher(QMainWindow):
     
     def copy_path(self, row):
         # 获取文件路径
-        file_path = self.table.item(row, 6).text()
+        file_path = self.model.paths[self.source_row(row)]
         
         # 复制到剪贴板
         clipboard = QApplication.clipboard()
@@ -668,21 +976,15 @@ class FileSearcher(QMainWindow):
         self.statusBar().showMessage('文件路径已复制到剪贴板', 3000)
     
     def closeEvent(self, event):
-        # 保存历史记录
-        self.save_history_to_file()
+        # 等待后台写入完成后立即保存历史记录
+        self.history_save_timer.stop()
+        QThreadPool.globalInstance().waitForDone()
+        try:
+            write_history_file(self.history_data())
+        except Exception as e:
+            print(f"保存历史记录失败: {e}")
         event.accept()
     
-    def format_size(self, size_bytes):
-        # 格式化文件大小
-        if size_bytes < 1024:
-            return f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes / 1024:.2f} KB"
-        elif size_bytes < 1024 * 1024 * 1024:
-            return f"{size_bytes / (1024 * 1024):.2f} MB"
-        else:
-            return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
-    
     def format_time(self, seconds):
         # 格式化时间
         minutes, seconds = divmod(int(seconds), 60)
@@ -694,18 +996,17 @@ class FileSearcher(QMainWindow):
             return f"{minutes:02d}:{seconds:02d}"
     
     def add_to_search_history(self, record):
-        # 避免重复记录
-        for i, hist in enumerate(self.search_history):
-            if hist["path"] == record["path"] and hist["term"] == record["term"]:
-                self.search_history.pop(i)
-                break
+        # 避免重复记录，相同路径和关键词的旧记录直接替换
+        key = (record["path"], record["term"])
+        self.search_history.pop(key, None)
         
-        # 添加到历史记录
-        self.search_history.insert(0, record)
+        # 添加到历史记录的最前面
+        self.search_history[key] = record
+        self.search_history.move_to_end(key, last=False)
         
         # 限制历史记录数量
-        if len(self.search_history) > 20:
-            self.search_history = self.search_history[:20]
+        while len(self.search_history) > 20:
+            self.search_history.popitem(last=True)
         
         # 更新下拉菜单
         self.update_history_combo()
@@ -714,12 +1015,17 @@ class FileSearcher(QMainWindow):
         self.save_history_to_file()
     
     def update_history_combo(self):
-        self.history_combo.clear()
-        self.history_combo.addItem("搜索历史")
-        
-        for record in self.search_history:
-            display_text = f"{record['time']} - {record['term'] or '所有文件'} in {os.path.basename(record['path'])}"
-            self.history_combo.addItem(display_text, record)
+        # 重建期间屏蔽信号，避免触发load_search_history
+        self.history_combo.blockSignals(True)
+        try:
+            self.history_combo.clear()
+            self.history_combo.addItem("搜索历史")
+            
+            for record in self.search_history.values():
+                display_text = f"{record['time']} - {record['term'] or '所有文件'} in {os.path.basename(record['path'])}"
+                self.history_combo.addItem(display_text, record)
+        finally:
+            self.history_combo.blockSignals(False)
     
     def load_search_history(self, index):
         if index <= 0:
@@ -743,27 +1049,52 @@ class FileSearcher(QMainWindow):
     
     def load_history_from_file(self):
         try:
-            history_file = os.path.join(os.path.expanduser("~"), ".file_searcher_history.json")
-            if os.path.exists(history_file):
-                with open(history_file, 'r', encoding='utf-8') as f:
+            if os.path.exists(HISTORY_FILE):
+                with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    self.search_history = data.get("search_history", [])
+                    self.search_history = OrderedDict(
+                        ((record["path"], record["term"]), record)
+                        for record in data.get("search_history", [])
+                    )
                     self.delete_history = data.get("delete_history", [])
                     self.update_history_combo()
         except Exception as e:
             print(f"加载历史记录失败: {e}")
     
     def save_history_to_file(self):
-        try:
-            history_file = os.path.join(os.path.expanduser("~"), ".file_searcher_history.json")
-            with open(history_file, 'w', encoding='utf-8') as f:
-                data = {
-                    "search_history": self.search_history,
-                    "delete_history": self.delete_history
-                }
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存历史记录失败: {e}")
+        # 安排保存历史记录，计时器已在运行时本次修改会随之一起写入
+        if not self.history_save_timer.isActive():
+            self.history_save_timer.start()
+    
+    def flush_history(self):
+        # 复制当前历史记录，交给线程池写入文件
+        QThreadPool.globalInstance().start(HistoryWriter(self.history_data()))
+    
+    def history_data(self):
+        return {
+            "search_history": list(self.search_history.values()),
+            "delete_history": list(self.delete_history)
+        }
+    
+    def set_search_errors(self, errors, count):
+        # 保存本次搜索的错误信息
+        self.search_errors = errors
+        self.search_error_count = count
+        self.view_errors_button.setEnabled(count > 0)
+        self.view_errors_button.setText(f"查看错误 ({count})" if count else "查看错误")
+    
+    def show_search_errors(self):
+        # 显示搜索过程中的错误
+        if not self.search_errors:
+            return
+        
+        message = f"搜索过程中共发生 {self.search_error_count} 个错误"
+        if self.search_error_count > len(self.search_errors):
+            message += f"，以下为最近的 {len(self.search_errors)} 个"
+        
+        box = QMessageBox(QMessageBox.Warning, "搜索错误", message, QMessageBox.Ok, self)
+        box.setDetailedText("\n".join(f"{path}: {error}" for path, error in self.search_errors))
+        box.exec_()
     
     def show_delete_history(self):
         # 创建删除历史对话框
@@ -789,13 +1120,18 @@ class DeleteHistoryDialog(QDialog):
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
         self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
         
-        # 填充表格
-        for record in history:
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            self.table.setItem(row, 0, QTableWidgetItem(record["file_name"]))
-            self.table.setItem(row, 1, QTableWidgetItem(record["file_path"]))
-            self.table.setItem(row, 2, QTableWidgetItem(record["time"]))
+        # 填充表格（一次设置好行数，填充期间暂停刷新和信号）
+        self.table.setUpdatesEnabled(False)
+        self.table.blockSignals(True)
+        try:
+            self.table.setRowCount(len(history))
+            for row, record in enumerate(history):
+                self.table.setItem(row, 0, QTableWidgetItem(record["file_name"]))
+                self.table.setItem(row, 1, QTableWidgetItem(record["file_path"]))
+                self.table.setItem(row, 2, QTableWidgetItem(record["time"]))
+        finally:
+            self.table.blockSignals(False)
+            self.table.setUpdatesEnabled(True)
         
         layout.addWidget(self.table)
         
@@ -5,6 +5,10 @@ import sys
 import math
 import json
 import os
+import weakref
+from functools import lru_cache
+import itertools
+from collections import deque
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QGraphicsScene, QGraphicsView,
                              QGraphicsItem, QGraphicsEllipseItem, QGraphicsRectItem,
                              QGraphicsLineItem, QGraphicsTextItem, QGraphicsPolygonItem,
@@ -12,13 +16,25 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QGraphicsScene, QGraphic
                              QToolBar, QComboBox, QPushButton, QVBoxLayout, QHBoxLayout,
                              QWidget, QLabel, QLineEdit, QDialog, QFormLayout, QDialogButtonBox,
                              QFileDialog, QGraphicsPathItem, QStackedWidget, QSlider)
-from PyQt5.QtCore import Qt, QPointF, QRectF, QLineF, QSizeF, QSize, QMarginsF
+from PyQt5.QtCore import Qt, QPointF, QRectF, QLineF, QSizeF, QSize, QMarginsF, QTimer
 from PyQt5.QtGui import QPen, QBrush, QColor, QPainterPath, QPolygonF, QFont, QIcon, QPainter, QPixmap, QFontMetrics, \
-    QLinearGradient, QImage, QPdfWriter, QPageSize, QKeySequence
+    QLinearGradient, QGradient, QImage, QPdfWriter, QPageSize, QKeySequence
 
 # 导入自定义模块
 from flowchart import export, extensions, advanced, save_functions
 
+# 如果安装了ijson则流式读取思维导图文件
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# 如果安装了orjson则使用更快的解码器
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 节点类型
 NODE_TYPES = {
     "中心主题": {"shape": "rounded_rect", "color": QColor(0, 176, 151)},  # 绿松石色
@@ -31,34 +47,133 @@ NODE_TYPES = {
 # 添加扩展节点类型
 NODE_TYPES.update(extensions.EXTENDED_NODE_TYPES)
 
+# 节点类型 -> (形状, 颜色)，创建节点时只需一次查找
+NODE_TYPE_SPECS = {name: (spec["shape"], spec["color"]) for name, spec in NODE_TYPES.items()}
+
+# 中心主题子节点环形分布的方向表，每个子节点间隔40度
+RING_ANGLES = tuple((math.cos(math.radians(a)), math.sin(math.radians(a))) for a in range(0, 360, 40))
+
+@lru_cache(maxsize=256)
+def color_from_name(name):
+    """按颜色名称（如#rrggbb）创建颜色，同一种颜色只解析一次（调用方不要修改返回值）"""
+    return QColor(name)
+
+def _load_json_file(file_path):
+    """读取整个JSON文件"""
+    if orjson is not None:
+        with open(file_path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _iter_json_arrays(file_path, names):
+    """只解析一遍JSON文件，返回{数组名: 逐个产生该顶层数组元素的生成器}，不把整个文件解析到内存中"""
+    item_prefixes = {name + '.item': name for name in names}
+    # 读取某个数组时遇到的其他数组的元素先暂存，等读取那个数组时再取出
+    pending = {name: deque() for name in names}
+    found = set()  # 文件中出现过的数组
+    
+    def parse_items():
+        with open(file_path, 'rb') as f:
+            builder = None
+            for prefix, event, value in ijson.parse(f, use_float=True):
+                if event == 'start_array' and prefix in pending:
+                    found.add(prefix)
+                if builder is not None:
+                    builder.event(event, value)
+                    if prefix == item_prefix and event in ('end_map', 'end_array'):
+                        yield item_prefixes[item_prefix], builder.value
+                        builder = None
+                elif prefix in item_prefixes:
+                    if event in ('start_map', 'start_array'):
+                        # 元素是对象或数组，收集到结束事件后再产生
+                        item_prefix = prefix
+                        builder = ijson.ObjectBuilder()
+                        builder.event(event, value)
+                    else:
+                        yield item_prefixes[prefix], value
+    
+    items = parse_items()
+    
+    def read_array(name):
+        queue = pending[name]
+        while True:
+            while queue:
+                yield queue.popleft()
+            item = next(items, None)
+            if item is None:
+                if name not in found:
+                    # 与一次性加载时缺少字段的行为一致
+                    raise KeyError(name)
+                return
+            item_name, value = item
+            if item_name == name:
+                yield value
+            else:
+                pending[item_name].append(value)
+    
+    return {name: read_array(name) for name in names}
+
+# 节点和连接线的编号，历史记录按编号引用图元，不受对象回收后id被复用的影响
+_item_uids = itertools.count(1)
+
+def _bezier_ctrl_points(sx, sy, ex, ey):
+    """根据起点和终点计算连接线的两个控制点和终点处箭头的角度"""
+    dx = ex - sx
+    dy = ey - sy
+    
+    # 判断是否是水平或垂直布局，使用不同的控制点策略
+    if abs(dx) > abs(dy):
+        # 水平布局，控制点在x方向上偏移
+        c1x, c1y = sx + dx * 0.5, sy
+        c2x, c2y = ex - dx * 0.1, ey
+    else:
+        # 垂直布局，控制点在y方向上偏移
+        c1x, c1y = sx, sy + dy * 0.5
+        c2x, c2y = ex, ey - dy * 0.1
+    
+    # 箭头方向（简化为控制点到终点的方向）
+    angle = math.atan2(ey - c2y, ex - c2x)
+    return c1x, c1y, c2x, c2y, angle
+
 class FlowchartNode(QGraphicsItem):
     """思维导图节点"""
     
     def __init__(self, node_type, text="", pos=QPointF(0, 0), parent=None):
         super().__init__(parent)
+        self.uid = next(_item_uids)
         self.node_type = node_type
         self.node_text = text
         
         # 根据文本长度自适应节点大小
-        font = QFont()
-        font.setPointSize(10)
-        metrics = QFontMetrics(font)
-        text_width = metrics.width(text) + 40  # 添加一些填充
-        text_height = metrics.height() * (1 + text.count('\n')) + 20
-        
-        self.width = max(120, text_width)  # 最小宽度
-        self.height = max(40, text_height)  # 最小高度
+        self.width, self.height = extensions.measure_node_text(text)
         
-        self.color = NODE_TYPES[node_type]["color"]
-        self.shape_type = NODE_TYPES[node_type]["shape"]
+        self.shape_type, self.color = NODE_TYPE_SPECS[node_type]
         self.connections = []  # 存储连接到此节点的连接线
+        self.children = []  # 直接子节点，由连接线创建和删除时维护
+        self.parents = []  # 直接父节点
+        self.fill_brush = None  # 自定义填充画刷，None表示使用默认渐变
+        
+        # 按尺寸缓存的主体矩形和云形状路径，尺寸变化时才重新构建
+        self._cached_rect = None
+        self._cached_rect_size = None
+        self._cached_cloud_path = None
+        self._cached_cloud_size = None
+        self._brush_cache = None
+        self._brush_cache_key = None
+        self._main_window_ref = None  # 所在主窗口的弱引用，加入场景时记录
         
         # 设置节点属性
         self.setFlag(QGraphicsItem.ItemIsMovable)
         self.setFlag(QGraphicsItem.ItemIsSelectable)
         self.setFlag(QGraphicsItem.ItemSendsGeometryChanges)
+        # 让paint中的option.exposedRect是实际需要重绘的区域（否则总是整个边界矩形）
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
         self.setAcceptHoverEvents(True)
         
+        # 缓存节点的绘制结果，平移和拖动时不必重新执行paint（缩放会使缓存失效并重新绘制；导出时临时关闭缓存）
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        
         # 设置位置
         self.setPos(pos)
     
@@ -71,20 +186,37 @@ class FlowchartNode(QGraphicsItem):
     
     def shape(self):
         """返回节点的形状用于碰撞检测"""
-        path = QPainterPath()
+        if self.shape_type == "cloud":
+            # 云形状直接使用缓存的路径
+            return self._get_cloud_path()
         
+        path = QPainterPath()
         if self.shape_type == "rounded_rect":
-            rect = QRectF(-self.width/2, -self.height/2, self.width, self.height)
-            path.addRoundedRect(rect, 10, 10)  # 圆角矩形
-        elif self.shape_type == "cloud":
-            # 绘制一个简单的云形状
-            self._draw_cloud_path(path)
+            path.addRoundedRect(self._get_body_rect(), 10, 10)  # 圆角矩形
         else:
             # 默认使用矩形
-            path.addRect(QRectF(-self.width/2, -self.height/2, self.width, self.height))
+            path.addRect(self._get_body_rect())
             
         return path
     
+    def _get_body_rect(self):
+        """返回节点主体矩形，尺寸不变时复用"""
+        size = (self.width, self.height)
+        if self._cached_rect_size != size:
+            self._cached_rect = QRectF(-self.width/2, -self.height/2, self.width, self.height)
+            self._cached_rect_size = size
+        return self._cached_rect
+    
+    def _get_cloud_path(self):
+        """返回云形状的路径，尺寸不变时复用上次构建的结果"""
+        size = (self.width, self.height)
+        if self._cached_cloud_size != size:
+            path = QPainterPath()
+            self._draw_cloud_path(path)
+            self._cached_cloud_path = path
+            self._cached_cloud_size = size
+        return self._cached_cloud_path
+    
     def _draw_cloud_path(self, path):
         """绘制云形状的路径"""
         # 云形状由多个圆弧组成
@@ -115,54 +247,78 @@ class FlowchartNode(QGraphicsItem):
     
     def paint(self, painter, option, widget):
         """绘制节点"""
-        # 设置画笔和画刷
-        pen = QPen(Qt.black)
-        pen.setWidth(2)
-        if self.isSelected():
-            pen.setColor(Qt.red)
-        
-        # 设置渐变画刷来增强视觉效果
-        gradient = QLinearGradient(0, -self.height/2, 0, self.height/2)
-        gradient.setColorAt(0, self.color.lighter(110))
-        gradient.setColorAt(1, self.color)
-        brush = QBrush(gradient)
+        # 需要重绘的区域与节点不相交时直接跳过
+        if not option.exposedRect.intersects(self.boundingRect()):
+            return
         
-        painter.setPen(pen)
-        painter.setBrush(brush)
+        # 设置画笔和画刷（使用预先创建的画笔）
+        painter.setPen(extensions.SELECTED_NODE_PEN if self.isSelected() else extensions.DEFAULT_NODE_PEN)
+        painter.setBrush(self.fill_brush if self.fill_brush is not None else self.gradient_brush())
         
         # 根据形状绘制
         if self.shape_type == "rounded_rect":
-            rect = QRectF(-self.width/2, -self.height/2, self.width, self.height)
-            painter.drawRoundedRect(rect, 10, 10)  # 圆角矩形
+            painter.drawRoundedRect(self._get_body_rect(), 10, 10)  # 圆角矩形
         elif self.shape_type == "cloud":
             # 云形状由多个圆弧组成
-            path = QPainterPath()
-            self._draw_cloud_path(path)
-            painter.drawPath(path)
+            painter.drawPath(self._get_cloud_path())
         else:
             # 默认使用矩形
-            painter.drawRect(QRectF(-self.width/2, -self.height/2, self.width, self.height))
+            painter.drawRect(self._get_body_rect())
         
         # 绘制文本
-        font = QFont()
-        font.setPointSize(10)
-        if self.node_type == "中心主题":
-            font.setBold(True)
-            font.setPointSize(12)
-        
-        painter.setFont(font)
+        painter.setFont(extensions.node_font(self.node_type == "中心主题"))
         painter.setPen(Qt.black)
         text_rect = QRectF(-self.width/2 + 10, -self.height/2 + 5, self.width - 20, self.height - 10)
         painter.drawText(text_rect, Qt.AlignCenter | Qt.TextWordWrap, self.node_text)
     
+    def gradient_brush(self):
+        """返回节点的渐变画刷，颜色和高度不变时复用"""
+        key = (self.color.rgba(), self.height)
+        if self._brush_cache_key != key:
+            # 设置渐变画刷来增强视觉效果
+            gradient = QLinearGradient(0, -self.height/2, 0, self.height/2)
+            gradient.setColorAt(0, self.color.lighter(110))
+            gradient.setColorAt(1, self.color)
+            self._brush_cache = QBrush(gradient)
+            self._brush_cache_key = key
+        return self._brush_cache
+    
+    def setBrush(self, brush):
+        """设置节点的填充画刷（如折叠时的暗色画刷），传入None恢复默认渐变"""
+        self.fill_brush = brush
+        self.update()
+    
     def itemChange(self, change, value):
         """处理节点变化，主要用于更新连接线"""
         if change == QGraphicsItem.ItemPositionChange and self.scene():
-            # 更新所有连接到此节点的连接线
+            # 更新所有连接到此节点的可见连接线（隐藏的连接线在重新显示时再更新）
+            # 按连接线判断而不是按节点：折叠只隐藏直接子节点，隐藏的节点仍可能连着可见的孙节点
             for conn in self.connections:
-                conn.updatePosition()
+                if conn.isVisible():
+                    conn.updatePosition()
+        elif change == QGraphicsItem.ItemSelectedHasChanged:
+            # 选中状态决定边框颜色，需要重新生成缓存的图像
+            self.update()
+        elif change == QGraphicsItem.ItemSceneChange:
+            # 离开原来的场景，更新其节点计数和索引
+            if isinstance(self.scene(), FlowchartScene):
+                self.scene().item_removed(self)
+        elif change == QGraphicsItem.ItemSceneHasChanged:
+            if isinstance(value, FlowchartScene):
+                value.item_added(self)
+            
+            # 记录所在的主窗口，之后不必每次通过scene().views()查找
+            views = value.views() if value is not None else []
+            main_window = getattr(views[0], 'main_window', None) if views else None
+            self._main_window_ref = weakref.ref(main_window) if main_window is not None else None
         return super().itemChange(change, value)
     
+    @property
+    def main_window(self):
+        """节点所在的主窗口，节点不在场景中时为None"""
+        ref = self._main_window_ref
+        return ref() if ref is not None else None
+    
     def contextMenuEvent(self, event):
         """右键菜单"""
         menu = QMenu()
@@ -269,8 +425,8 @@ class FlowchartNode(QGraphicsItem):
     
     def addChildNode(self):
         """添加子节点"""
-        # 直接使用views中存储的main_window引用
-        main_window = self.scene().views()[0].main_window
+        # 使用加入场景时记录的main_window引用
+        main_window = self.main_window
         
         if main_window:
             # 调用主窗口的addNode方法，并传入当前节点作为父节点
@@ -284,6 +440,14 @@ class FlowchartNode(QGraphicsItem):
                                        text=self.node_text)
         if ok and text:
             self.node_text = text
+            
+            # 按新文本调整节点大小，并更新连接线
+            width, height = extensions.measure_node_text(text)
+            if (width, height) != (self.width, self.height):
+                self.prepareGeometryChange()
+                self.width, self.height = width, height
+                for conn in self.connections:
+                    conn.updatePosition()
             self.update()
     
     def deleteNode(self):
@@ -305,40 +469,39 @@ class FlowchartNode(QGraphicsItem):
         print(f"Deleting node: {self.node_text}")
         print(f"Child nodes to delete: {[node.node_text for node in nodes_to_delete]}")
         
-        # 先删除所有连接线
         scene = self.scene()
         if scene:
-            # 删除所有相关连接线
-            for item in list(scene.items()):
-                if isinstance(item, FlowchartConnection):
-                    if item.start_node == self or item.end_node == self or \
-                       item.start_node in nodes_to_delete or item.end_node in nodes_to_delete:
-                        scene.removeItem(item)
+            # 只需处理这些节点自身的连接线，不必遍历整个场景
+            nodes = set(nodes_to_delete)
+            nodes.add(self)
+            edges = {conn for node in nodes for conn in node.connections}
             
-            # 删除所有子节点
-            for node in nodes_to_delete:
-                if node in scene.items():
+            # 批量删除期间屏蔽场景信号，避免逐项发送变化通知
+            scene.blockSignals(True)
+            try:
+                # 先删除所有连接线（同时从两端节点的列表中移除）
+                for conn in edges:
+                    conn.deleteConnection()
+                
+                # 再删除当前节点和所有子节点
+                for node in nodes:
                     scene.removeItem(node)
-            
-            # 最后删除当前节点
-            scene.removeItem(self)
+            finally:
+                scene.blockSignals(False)
     
     def getAllChildNodes(self):
-        """获取所有子节点（递归）"""
+        """获取所有子节点（广度优先，包括子节点的子节点）"""
         child_nodes = []
-        scene = self.scene()
+        visited = {self}
+        queue = deque(self.children)
         
-        if not scene:
-            return child_nodes
-        
-        # 找出直接子节点
-        for item in scene.items():
-            if isinstance(item, FlowchartConnection) and item.start_node == self:
-                child_node = item.end_node
-                child_nodes.append(child_node)
-                
-                # 递归获取子节点的子节点
-                child_nodes.extend(child_node.getAllChildNodes())
+        while queue:
+            child_node = queue.popleft()
+            if child_node in visited:
+                continue
+            visited.add(child_node)
+            child_nodes.append(child_node)
+            queue.extend(child_node.children)
         
         return child_nodes
     
@@ -347,7 +510,7 @@ class FlowchartNode(QGraphicsItem):
         # 如果按住Ctrl键，则折叠/展开节点，否则编辑节点
         if event.modifiers() & Qt.ControlModifier:
             # 使用扩展模块的折叠/展开功能
-            advanced.extend_node_mouse_double_click_event(self, event, self.scene().views()[0].main_window)
+            advanced.extend_node_mouse_double_click_event(self, event, self.main_window)
         else:
             self.editNode()
     
@@ -357,60 +520,51 @@ class FlowchartNode(QGraphicsItem):
         if color.isValid():
             self.color = color
             self.update()
-            self.scene().views()[0].main_window.setModified(True)
+            self.main_window.setModified(True)
     
     def get_child_nodes(self):
         """获取直接子节点"""
-        child_nodes = []
-        scene = self.scene()
-        
-        if not scene:
-            return child_nodes
-        
-        for item in scene.items():
-            if isinstance(item, FlowchartConnection) and item.start_node == self:
-                child_node = item.end_node
-                child_nodes.append(child_node)
-        
-        return child_nodes
+        return list(self.children)
     
     def toggleFold(self):
         """切换节点的折叠/展开状态"""
-        main_window = self.scene().views()[0].main_window
-        if hasattr(main_window, 'shortcut_manager'):
-            # 通过快捷键管理器来切换折叠状态
-            main_window.shortcut_manager._toggle_fold_node(self)
+        advanced.get_node_folder(self.main_window).toggle_fold_node(self)
     
     def foldAllLevels(self):
         """折叠所有层级的子节点"""
-        main_window = self.scene().views()[0].main_window
-        if hasattr(main_window, 'shortcut_manager'):
-            # 使用快捷键管理器的多层折叠方法
-            main_window.shortcut_manager._fold_all_levels(self)
+        advanced.get_node_folder(self.main_window).fold_all_levels(self)
     
     def expandAllLevels(self):
         """展开所有层级的子节点"""
         # 获取所有子节点（包括子节点的子节点）
         all_descendants = self.getAllChildNodes()
         
-        # 将所有子节点设置为可见，并取消折叠状态
-        for child in all_descendants:
-            child.setVisible(True)
-            if hasattr(child, 'is_folded'):
-                child.is_folded = False
-        
-        # 还需要将当前节点的折叠状态取消
-        self.is_folded = False
-        
-        # 更新场景
-        self.scene().update()
+        main_window = self.main_window
+        
+        # 批量修改期间暂停刷新，结束后视图整体重绘一次
+        with advanced.batch_scene_update(main_window) as affected:
+            # 将所有子节点及指向它们的连接线设置为可见，并取消折叠状态
+            for child in all_descendants:
+                child.setVisible(True)
+                if hasattr(child, 'is_folded'):
+                    child.is_folded = False
+                affected.append(child)
+                for conn in child.connections:
+                    if conn.end_node is child:
+                        conn.updatePosition()
+                        conn.setVisible(True)
+                        affected.append(conn)
+            
+            # 还需要将当前节点的折叠状态取消
+            self.is_folded = False
+            affected.append(self)
         
         # 标记为已修改
-        self.scene().views()[0].main_window.setModified(True)
+        main_window.setModified(True)
     
     def addImage(self):
         """添加图片到节点"""
-        main_window = self.scene().views()[0].main_window
+        main_window = self.main_window
         file_path, _ = QFileDialog.getOpenFileName(
             main_window, 
             "选择图片", 
@@ -420,8 +574,7 @@ class FlowchartNode(QGraphicsItem):
         
         if file_path:
             try:
-                self.image = QPixmap(file_path)
-                self.update()
+                extensions.set_node_image(self, file_path, main_window.devicePixelRatioF())
                 main_window.setModified(True)
             except Exception as e:
                 QMessageBox.critical(main_window, "错误", f"无法加载图片: {str(e)}")
@@ -430,12 +583,14 @@ class FlowchartNode(QGraphicsItem):
         """从节点移除图片"""
         if hasattr(self, 'image') and self.image is not None:
             self.image = None
+            self.image_path = None
+            self._scaled_image = None
             self.update()
-            self.scene().views()[0].main_window.setModified(True)
+            self.main_window.setModified(True)
     
     def addLink(self):
         """添加链接到节点"""
-        main_window = self.scene().views()[0].main_window
+        main_window = self.main_window
         link, ok = QInputDialog.getText(
             main_window, 
             "添加链接", 
@@ -453,49 +608,47 @@ class FlowchartNode(QGraphicsItem):
         if hasattr(self, 'link') and self.link:
             self.link = None
             self.update()
-            self.scene().views()[0].main_window.setModified(True)
+            self.main_window.setModified(True)
     
     def connectToNode(self, target_node):
         """将当前节点连接到目标节点"""
         # 检查是否已经有连接
-        for item in self.scene().items():
-            if isinstance(item, FlowchartConnection):
-                if (item.start_node == self and item.end_node == target_node) or \
-                   (item.start_node == target_node and item.end_node == self):
-                    # 已经有连接，显示提示并返回
-                    QMessageBox.information(None, "提示", "这两个节点已经有连接")
-                    return
-        
-        # 创建新连接
+        if target_node in self.children or target_node in self.parents:
+            # 已经有连接，显示提示并返回
+            QMessageBox.information(None, "提示", "这两个节点已经有连接")
+            return
+        
+        # 创建新连接（构造时会加入两端节点的连接列表）
         connection = FlowchartConnection(self, target_node)
         self.scene().addItem(connection)
         
-        # 添加到连接列表
-        self.connections.append(connection)
-        target_node.connections.append(connection)
-        
         # 标记为已修改
-        self.scene().views()[0].main_window.setModified(True)
+        self.main_window.setModified(True)
 
 class FlowchartConnection(QGraphicsPathItem):
     """思维导图连接线"""
     
-    def __init__(self, start_node, end_node, parent=None):
+    def __init__(self, start_node, end_node, parent=None, color=None, width=2):
         super().__init__(parent)
+        self.uid = next(_item_uids)
         self.start_node = start_node
         self.end_node = end_node
         
-        # 将此连接添加到两个节点的连接列表中
+        # 将此连接添加到两个节点的连接列表中，并记录父子关系
         self.start_node.connections.append(self)
         self.end_node.connections.append(self)
+        self.start_node.children.append(self.end_node)
+        self.end_node.parents.append(self.start_node)
         
-        # 生成随机颜色，但保持较浅的色调
-        hue = (hash(str(start_node) + str(end_node)) % 360) / 360.0
-        self.color = QColor.fromHsvF(hue, 0.5, 0.9)
+        # 没有指定颜色时生成随机颜色，但保持较浅的色调
+        if color is None:
+            hue = (hash((id(start_node), id(end_node))) % 360) / 360.0
+            color = QColor.fromHsvF(hue, 0.5, 0.9)
+        self.color = color
         
         # 设置线条样式
         pen = QPen(self.color)
-        pen.setWidth(2)
+        pen.setWidth(width)
         self.setPen(pen)
         
         # 初始化连接线位置
@@ -504,54 +657,59 @@ class FlowchartConnection(QGraphicsPathItem):
         # 设置可选择
         self.setFlag(QGraphicsItem.ItemIsSelectable)
     
+    def itemChange(self, change, value):
+        """加入或离开场景时更新场景的图元索引"""
+        if change == QGraphicsItem.ItemSceneChange:
+            if isinstance(self.scene(), FlowchartScene):
+                self.scene().item_removed(self)
+        elif change == QGraphicsItem.ItemSceneHasChanged:
+            if isinstance(value, FlowchartScene):
+                value.item_added(self)
+        return super().itemChange(change, value)
+    
+    def boundingRect(self):
+        """返回连接线的边界矩形（包含箭头的范围）"""
+        return super().boundingRect().adjusted(-12, -12, 12, 12)
+    
     def updatePosition(self):
         """更新连接线位置"""
         # 获取起点和终点的中心位置
         start_pos = self.start_node.scenePos()
         end_pos = self.end_node.scenePos()
         
-        # 创建路径
-        path = QPainterPath()
-        
-        # 计算起点和终点之间的距离和方向
-        line = QLineF(start_pos, end_pos)
-        length = line.length()
-        
-        # 确定控制点的偏移量，让曲线更自然
-        offset_factor = min(length / 200.0, 1.0) * 50  # 根据距离调整控制点偏移
+        # 计算控制点的位置和箭头方向（纯数值计算，不创建Qt对象）
+        ex, ey = end_pos.x(), end_pos.y()
+        c1x, c1y, c2x, c2y, angle = _bezier_ctrl_points(start_pos.x(), start_pos.y(), ex, ey)
         
-        # 计算控制点的位置
-        # 如果是水平或垂直布局，使用不同的控制点策略
-        dx = end_pos.x() - start_pos.x()
-        dy = end_pos.y() - start_pos.y()
-        
-        # 判断是否是水平或垂直布局
-        is_horizontal = abs(dx) > abs(dy)
-        
-        if is_horizontal:
-            # 水平布局，控制点在x方向上偏移
-            ctrl1 = QPointF(start_pos.x() + dx * 0.5, start_pos.y())
-            ctrl2 = QPointF(end_pos.x() - dx * 0.1, end_pos.y())
-        else:
-            # 垂直布局，控制点在y方向上偏移
-            ctrl1 = QPointF(start_pos.x(), start_pos.y() + dy * 0.5)
-            ctrl2 = QPointF(end_pos.x(), end_pos.y() - dy * 0.1)
-        
-        # 绘制起点
+        # 绘制起点和三次贝塞尔曲线
+        path = QPainterPath()
         path.moveTo(start_pos)
-        
-        # 绘制三次贝塞尔曲线
-        path.cubicTo(ctrl1, ctrl2, end_pos)
+        path.cubicTo(c1x, c1y, c2x, c2y, ex, ey)
         
         # 设置路径
         self.setPath(path)
         
-        # 存储终点信息用于绘制箭头
+        # 存储终点信息和箭头方向，并预先计算箭头多边形，重绘时直接使用
         self.end_point = end_pos
+        self.angle = angle
+        self._arrow_polygon = self._build_arrow(end_pos, angle)
+    
+    def _build_arrow(self, tip, angle):
+        """根据箭头尖端和方向构建箭头多边形"""
+        # 箭头大小和形状
+        arrow_size = 12
+        arrow_angle = math.pi / 6  # 30度
         
-        # 计算箭头方向（基于终点附近的曲线切线）
-        # 这里简化处理，使用控制点到终点的方向
-        self.angle = math.atan2(end_pos.y() - ctrl2.y(), end_pos.x() - ctrl2.x())
+        # 计算箭头的三个点（用浮点数计算，最后才创建QPointF）
+        cos, sin = math.cos, math.sin
+        base_x = tip.x() - cos(angle) * arrow_size
+        base_y = tip.y() - sin(angle) * arrow_size
+        angle1 = angle + arrow_angle
+        angle2 = angle - arrow_angle
+        arrow_p2 = QPointF(base_x - cos(angle1) * arrow_size, base_y - sin(angle1) * arrow_size)
+        arrow_p3 = QPointF(base_x - cos(angle2) * arrow_size, base_y - sin(angle2) * arrow_size)
+        
+        return QPolygonF([tip, arrow_p2, arrow_p3])
     
     def paint(self, painter, option, widget):
         """绘制连接线，包括箭头"""
@@ -561,6 +719,7 @@ class FlowchartConnection(QGraphicsPathItem):
             pen.setColor(Qt.red)
             pen.setWidth(3)
         painter.setPen(pen)
+        painter.setBrush(Qt.NoBrush)
         
         # 绘制路径
         painter.drawPath(self.path())
@@ -570,24 +729,10 @@ class FlowchartConnection(QGraphicsPathItem):
     
     def drawArrow(self, painter):
         """绘制箭头"""
-        if not hasattr(self, 'end_point') or not hasattr(self, 'angle'):
+        # 箭头多边形在updatePosition中已经计算好
+        arrow = getattr(self, '_arrow_polygon', None)
+        if arrow is None:
             return
-            
-        # 箭头大小和形状
-        arrow_size = 12
-        arrow_angle = math.pi / 6  # 30度
-        
-        # 计算箭头的三个点
-        tip = self.end_point
-        arrow_p1 = tip - QPointF(math.cos(self.angle) * arrow_size, 
-                               math.sin(self.angle) * arrow_size)
-        arrow_p2 = arrow_p1 - QPointF(math.cos(self.angle + arrow_angle) * arrow_size,
-                                    math.sin(self.angle + arrow_angle) * arrow_size)
-        arrow_p3 = arrow_p1 - QPointF(math.cos(self.angle - arrow_angle) * arrow_size,
-                                    math.sin(self.angle - arrow_angle) * arrow_size)
-        
-        # 创建箭头多边形
-        arrow = QPolygonF([tip, arrow_p2, arrow_p3])
         
         # 设置画刷和画笔
         if self.isSelected():
@@ -617,19 +762,29 @@ class FlowchartConnection(QGraphicsPathItem):
         """更改连接线颜色"""
         color = QColorDialog.getColor(self.color, None, "选择连接线颜色")
         if color.isValid():
-            self.color = color
-            pen = self.pen()
-            pen.setColor(color)
-            self.setPen(pen)
-            self.update()
+            self.set_style(color)
+    
+    def set_style(self, color, width=None):
+        """设置连接线的颜色和宽度，样式没有变化时不重新设置画笔"""
+        self.color = color
+        pen = self.pen()
+        if pen.color() == color and (width is None or pen.width() == width):
+            return
+        pen.setColor(color)
+        if width is not None:
+            pen.setWidth(width)
+        # setPen会自行安排重绘，不需要再调用update
+        self.setPen(pen)
     
     def deleteConnection(self):
         """删除连接线"""
         # 从节点的连接列表中移除此连接
         if hasattr(self, 'start_node') and self in self.start_node.connections:
             self.start_node.connections.remove(self)
+            self.start_node.children.remove(self.end_node)
         if hasattr(self, 'end_node') and self in self.end_node.connections:
             self.end_node.connections.remove(self)
+            self.end_node.parents.remove(self.start_node)
         
         # 从场景中移除
         scene = self.scene()
@@ -707,13 +862,52 @@ class NodePropertiesDialog(QDialog):
             "color": self.color
         }
 
+class FlowchartScene(QGraphicsScene):
+    """思维导图场景，记录节点数量，不必遍历所有图元"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # 以下由节点和连接线加入/离开场景时更新
+        self.node_count = 0
+        self.center_node_count = 0
+        self.items_by_id = {}  # 图元编号(uid) -> 图元，撤销/重做时按编号查找
+    
+    def item_added(self, item):
+        """节点或连接线加入场景"""
+        self.items_by_id[item.uid] = item
+        if isinstance(item, FlowchartNode):
+            self.node_count += 1
+            if item.node_type == "中心主题":
+                self.center_node_count += 1
+    
+    def item_removed(self, item):
+        """节点或连接线离开场景"""
+        self.items_by_id.pop(item.uid, None)
+        if isinstance(item, FlowchartNode):
+            self.node_count -= 1
+            if item.node_type == "中心主题":
+                self.center_node_count -= 1
+    
+    def clear(self):
+        """清空场景（删除图元时不会通知图元，计数和索引直接清空）"""
+        super().clear()
+        self.node_count = 0
+        self.center_node_count = 0
+        self.items_by_id.clear()
+
 class FlowchartView(QGraphicsView):
     """思维导图视图"""
     
+    INDEX_NODE_THRESHOLD = 1000  # 节点数达到该值时才使用BSP索引
+    
     def __init__(self, scene, parent=None):
         super().__init__(scene, parent)
         self.setRenderHint(QPainter.Antialiasing)
-        self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        # 只重绘发生变化的区域，各项的paint自行设置画笔画刷，无需保存绘制状态
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setOptimizationFlag(QGraphicsView.DontSavePainterState, True)
+        # 节点和连接线的边界矩形已包含画笔宽度，无需再为抗锯齿扩展重绘区域
+        self.setOptimizationFlag(QGraphicsView.DontAdjustForAntialiasing, True)
         self.setDragMode(QGraphicsView.RubberBandDrag)
         
         # 连接线绘制状态
@@ -721,6 +915,10 @@ class FlowchartView(QGraphicsView):
         self.temp_line = None
         self.start_node = None
         
+        # 拖动节点期间关闭抗锯齿，释放后恢复；按下时只记录，真正开始移动后才关闭
+        self.node_pressed = False
+        self.node_dragging = False
+        
         # 设置背景颜色
         self.setBackgroundBrush(QBrush(QColor(240, 240, 240)))
         
@@ -740,16 +938,9 @@ class FlowchartView(QGraphicsView):
         
         # 如果点击在空白处
         if not item:
-            # 检查场景中是否有中心主题
-            has_center_node = False
-            has_nodes = False
-            
-            for scene_item in self.scene().items():
-                if isinstance(scene_item, FlowchartNode):
-                    has_nodes = True
-                    if scene_item.node_type == "中心主题":
-                        has_center_node = True
-                        break
+            # 检查场景中是否有中心主题（使用场景记录的节点数量）
+            has_nodes = self.scene().node_count > 0
+            has_center_node = self.scene().center_node_count > 0
             
             # 如果没有任何节点，则显示创建中心主题的选项
             if not has_nodes:
@@ -805,6 +996,9 @@ class FlowchartView(QGraphicsView):
                 event.accept()
                 return
         
+        # 按在节点上时先不改变抗锯齿：选中节点会重新生成其缓存图像，此时仍需抗锯齿
+        self.node_pressed = event.button() == Qt.LeftButton and isinstance(self.itemAt(event.pos()), FlowchartNode)
+        
         super().mousePressEvent(event)
     
     def mouseMoveEvent(self, event):
@@ -817,6 +1011,11 @@ class FlowchartView(QGraphicsView):
             event.accept()
             return
         
+        if self.node_pressed and not self.node_dragging and event.buttons() & Qt.LeftButton:
+            # 开始拖动节点，连接线每帧都要重绘，暂时关闭抗锯齿以加快绘制
+            self.node_dragging = True
+            self.setRenderHint(QPainter.Antialiasing, False)
+        
         super().mouseMoveEvent(event)
     
     def mouseReleaseEvent(self, event):
@@ -844,6 +1043,33 @@ class FlowchartView(QGraphicsView):
             return
         
         super().mouseReleaseEvent(event)
+        
+        if event.button() == Qt.LeftButton:
+            self.node_pressed = False
+            if self.node_dragging:
+                # 拖动结束，恢复抗锯齿并按最终位置重绘一次
+                self.node_dragging = False
+                self.setRenderHint(QPainter.Antialiasing, True)
+                # 拖动期间节点的缓存图像可能是在关闭抗锯齿时生成的，通知被拖动的节点重新生成
+                for item in self.scene().selectedItems():
+                    if isinstance(item, FlowchartNode):
+                        item.update()
+                self.viewport().update()
+    
+    def set_index_mode(self, auto=True):
+        """设置场景的索引方式
+        
+        auto为True时按节点数量选择：节点不多时不建立BSP索引，因为拖动子树时
+        所有节点一起移动，每次移动都要更新索引，开销大于遍历查找；节点很多时
+        查找的开销占主导，仍使用BSP索引。auto为False时固定使用BSP索引。
+        """
+        scene = self.scene()
+        if auto and scene.node_count < self.INDEX_NODE_THRESHOLD:
+            method = QGraphicsScene.NoIndex
+        else:
+            method = QGraphicsScene.BspTreeIndex
+        if scene.itemIndexMethod() != method:
+            scene.setItemIndexMethod(method)
     
     def wheelEvent(self, event):
         """鼠标滚轮事件 - 用于缩放"""
@@ -859,6 +1085,8 @@ class FlowchartView(QGraphicsView):
 class WelcomeWidget(QWidget):
     """欢迎界面小部件"""
     
+    _example_pixmap_cache = None  # 示例图片内容固定，只绘制一次
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent = parent
@@ -952,17 +1180,24 @@ class WelcomeWidget(QWidget):
             "• 使用鼠标滚轮可以放大或缩小视图"
         ]
         
-        for tip in tips:
-            tip_label = QLabel(tip)
-            tip_label.setStyleSheet("color: #444; padding: 2px;")
-            tips_layout.addWidget(tip_label)
+        # 所有提示放在同一个富文本标签中，不必为每条提示创建控件
+        tips_label = QLabel("".join(f"<p style='margin: 2px 0;'>{tip}</p>" for tip in tips))
+        tips_label.setTextFormat(Qt.RichText)
+        tips_label.setStyleSheet("color: #444;")
+        tips_layout.addWidget(tips_label)
         
         layout.addWidget(tips_container)
     
     def create_example_mindmap(self):
-        """创建示例思维导图图片"""
-        # 创建一个空白图片
-        pixmap = QPixmap(600, 250)
+        """创建示例思维导图图片（结果缓存，设备像素比变化时才重新绘制）"""
+        dpr = self.devicePixelRatioF()
+        cached = WelcomeWidget._example_pixmap_cache
+        if cached is not None and cached.devicePixelRatioF() == dpr:
+            return cached
+        
+        # 创建一个空白图片（按物理像素创建，高分屏上也清晰）
+        pixmap = QPixmap(int(600 * dpr), int(250 * dpr))
+        pixmap.setDevicePixelRatio(dpr)
         pixmap.fill(Qt.white)
         
         # 创建画布
@@ -987,75 +1222,81 @@ class WelcomeWidget(QWidget):
         pen.setWidth(2)
         painter.setPen(pen)
         
-        # 绘制曲线连接
-        path1 = QPainterPath()
-        path1.moveTo(center_pos)
-        path1.cubicTo(center_pos.x() - 50, center_pos.y() - 30, 
+        # 绘制曲线连接（四条曲线画笔相同，合并为一条路径一次绘制）
+        path = QPainterPath()
+        path.moveTo(center_pos)
+        path.cubicTo(center_pos.x() - 50, center_pos.y() - 30, 
                      branch1_pos.x() + 50, branch1_pos.y() + 30, 
                      branch1_pos.x() + 40, branch1_pos.y())
-        painter.drawPath(path1)
         
-        path2 = QPainterPath()
-        path2.moveTo(center_pos)
-        path2.cubicTo(center_pos.x() + 50, center_pos.y() - 30, 
+        path.moveTo(center_pos)
+        path.cubicTo(center_pos.x() + 50, center_pos.y() - 30, 
                      branch2_pos.x() - 50, branch2_pos.y() + 30, 
                      branch2_pos.x() - 40, branch2_pos.y())
-        painter.drawPath(path2)
         
-        path3 = QPainterPath()
-        path3.moveTo(center_pos)
-        path3.cubicTo(center_pos.x() - 50, center_pos.y() + 30, 
+        path.moveTo(center_pos)
+        path.cubicTo(center_pos.x() - 50, center_pos.y() + 30, 
                      branch3_pos.x() + 30, branch3_pos.y() - 30, 
                      branch3_pos.x() + 40, branch3_pos.y())
-        painter.drawPath(path3)
         
-        path4 = QPainterPath()
-        path4.moveTo(center_pos)
-        path4.cubicTo(center_pos.x() + 50, center_pos.y() + 30, 
+        path.moveTo(center_pos)
+        path.cubicTo(center_pos.x() + 50, center_pos.y() + 30, 
                      branch4_pos.x() - 30, branch4_pos.y() - 30, 
                      branch4_pos.x() - 40, branch4_pos.y())
-        painter.drawPath(path4)
-        
-        # 绘制节点
-        # 中心节点
-        self.draw_rounded_rect(painter, center_pos, 100, 40, center_color, "中心主题")
+        painter.drawPath(path)
         
-        # 分支节点
-        self.draw_rounded_rect(painter, branch1_pos, 80, 30, branch1_color, "主要分支1")
-        self.draw_rounded_rect(painter, branch2_pos, 80, 30, branch2_color, "主要分支2")
-        self.draw_rounded_rect(painter, branch3_pos, 80, 30, branch3_color, "次要分支1")
-        self.draw_rounded_rect(painter, branch4_pos, 80, 30, branch3_color, "次要分支2")
+        # 绘制节点：(中心位置, 宽, 高, 颜色, 文字)
+        self.draw_rounded_rects(painter, [
+            (center_pos, 100, 40, center_color, "中心主题"),  # 中心节点
+            (branch1_pos, 80, 30, branch1_color, "主要分支1"),  # 分支节点
+            (branch2_pos, 80, 30, branch2_color, "主要分支2"),
+            (branch3_pos, 80, 30, branch3_color, "次要分支1"),
+            (branch4_pos, 80, 30, branch3_color, "次要分支2"),
+        ])
         
         painter.end()
+        WelcomeWidget._example_pixmap_cache = pixmap
         return pixmap
     
-    def draw_rounded_rect(self, painter, center, width, height, color, text):
-        """绘制圆角矩形节点"""
-        # 设置渐变画刷
-        gradient = QLinearGradient(center.x(), center.y() - height/2, center.x(), center.y() + height/2)
-        gradient.setColorAt(0, color.lighter(110))
-        gradient.setColorAt(1, color)
-        
-        # 绘制圆角矩形
-        rect = QRectF(center.x() - width/2, center.y() - height/2, width, height)
-        painter.setPen(QPen(color.darker(120)))
-        painter.setBrush(QBrush(gradient))
-        painter.drawRoundedRect(rect, 10, 10)
+    def draw_rounded_rects(self, painter, nodes):
+        """绘制圆角矩形节点，画笔、画刷和字体只在与上一个节点不同时才重新设置"""
+        rects = [QRectF(center.x() - width/2, center.y() - height/2, width, height)
+                 for center, width, height, _, _ in nodes]
+        
+        # 绘制圆角矩形（渐变按节点自身的边界计算，同一颜色的节点共用画刷）
+        current_color = None
+        for rect, (_, _, _, color, _) in zip(rects, nodes):
+            if color != current_color:
+                gradient = QLinearGradient(0, 0, 0, 1)
+                gradient.setCoordinateMode(QGradient.ObjectBoundingMode)
+                gradient.setColorAt(0, color.lighter(110))
+                gradient.setColorAt(1, color)
+                painter.setPen(QPen(color.darker(120)))
+                painter.setBrush(QBrush(gradient))
+                current_color = color
+            painter.drawRoundedRect(rect, 10, 10)
         
         # 绘制文字
         painter.setPen(Qt.black)
-        font = painter.font()
-        font.setBold(True if "\u4e2d\u5fc3" in text else False)
-        font.setPointSize(10 if "\u4e2d\u5fc3" in text else 9)
-        painter.setFont(font)
-        painter.drawText(rect, Qt.AlignCenter, text)
+        base_font = painter.font()
+        current_is_center = None
+        for rect, (_, _, _, _, text) in zip(rects, nodes):
+            is_center = "\u4e2d\u5fc3" in text
+            if is_center != current_is_center:
+                font = QFont(base_font)
+                font.setBold(is_center)
+                font.setPointSize(10 if is_center else 9)
+                painter.setFont(font)
+                current_is_center = is_center
+            painter.drawText(rect, Qt.AlignCenter, text)
 
 class FlowchartEditor(QMainWindow):
     """思维导图编辑器主窗口"""
     
     def __init__(self):
         super().__init__()
-        self.setWindowTitle("思维导图编辑器")
+        self.base_title = "思维导图编辑器"  # 不带修改标记的窗口标题
+        self.setWindowTitle(self.base_title)
         self.setMinimumSize(900, 700)
         
         # 创建中央部件堆栈
@@ -1067,10 +1308,11 @@ class FlowchartEditor(QMainWindow):
         self.central_stack.addWidget(self.welcome_widget)
         
         # 创建场景和视图
-        self.scene = QGraphicsScene(self)
-        self.scene.setSceneRect(-2500, -2500, 5000, 5000)
+        # 不固定场景范围，由Qt按图元边界自动扩展
+        self.scene = FlowchartScene(self)
         self.view = FlowchartView(self.scene, self)
         self.view.main_window = self  # 直接设置main_window引用
+        self.view.set_index_mode()
         self.central_stack.addWidget(self.view)
         
         # 默认显示欢迎界面
@@ -1082,10 +1324,16 @@ class FlowchartEditor(QMainWindow):
         # 修改状态标记
         self.is_modified = False
         
-        # 操作历史记录
-        self.history = []
-        self.history_index = -1
+        # 操作历史记录（超过最大数量时自动丢弃最早的记录）
         self.max_history = 20  # 最大历史记录数
+        self.history = deque(maxlen=self.max_history)
+        self.history_index = -1
+        
+        # 操作完成后的状态栏消息稍后统一显示，连续操作时只显示最后一条
+        self._status_pending = ""
+        self._status_timer = QTimer(self)
+        self._status_timer.setSingleShot(True)
+        self._status_timer.timeout.connect(lambda: self.statusBar().showMessage(self._status_pending))
         
         # 设置关闭事件处理
         self.setAttribute(Qt.WA_DeleteOnClose, True)
@@ -1093,10 +1341,11 @@ class FlowchartEditor(QMainWindow):
         # 导出设置
         self.export_margin = 20  # 导出时的边距
         
-        # 初始化导出器
-        self.exporter = export.FlowchartExporter(self)
+        # 导出器和节点折叠处理器在第一次使用时才创建
+        self._exporter = None
+        self.node_folder = None
         
-        # 初始化键盘快捷键管理器
+        # 快捷键需要在启动时注册，键盘快捷键管理器不能延迟创建
         self.shortcut_manager = advanced.KeyboardShortcutManager(self)
         
         # 创建工具栏
@@ -1105,42 +1354,73 @@ class FlowchartEditor(QMainWindow):
         # 创建状态栏
         self.statusBar().showMessage("准备就绪")
     
+    @property
+    def exporter(self):
+        """流程图导出器（第一次导出时创建）"""
+        if self._exporter is None:
+            self._exporter = export.FlowchartExporter(self)
+        return self._exporter
+    
     def closeEvent(self, event):
         """关闭窗口事件处理"""
-        if self.is_modified:
-            reply = QMessageBox.question(
-                self, "保存确认", 
-                "当前思维导图已被修改，是否保存？",
-                QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
-                QMessageBox.Save
-            )
-            
-            if reply == QMessageBox.Save:
-                if self.saveFlowchart():
-                    event.accept()
-                else:
-                    event.ignore()
-            elif reply == QMessageBox.Cancel:
-                event.ignore()
+        if self._prompt_save_if_modified(check_items=False) is False:
+            event.ignore()
         
         # 如果未修改或选择不保存，直接关闭
         # event.accept() 在这里是默认的
     
+    def _prompt_save_if_modified(self, check_items=True):
+        """有未保存的更改时提示保存
+        
+        Args:
+            check_items: 为True时场景为空则不提示
+        
+        Returns:
+            True表示可以继续，False表示取消操作（或保存失败），None表示无需提示
+        """
+        if not self.is_modified or (check_items and not self.scene.node_count):
+            return None
+        
+        reply = QMessageBox.question(
+            self, "保存确认", 
+            "当前思维导图已被修改，是否保存？",
+            QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
+            QMessageBox.Save
+        )
+        
+        if reply == QMessageBox.Save:
+            return bool(self.saveFlowchart())
+        return reply != QMessageBox.Cancel
+    
     def setModified(self, modified=True):
         """设置修改状态"""
+        # 状态没有变化时不必重新设置窗口标题
+        if modified == self.is_modified:
+            return
         self.is_modified = modified
         
         # 更新窗口标题显示修改状态
-        title = self.windowTitle()
-        if modified and not title.endswith('*'):
-            self.setWindowTitle(f"{title} *")
-        elif not modified and title.endswith(' *'):
-            self.setWindowTitle(title[:-2])
+        self.setWindowTitle(f"{self.base_title} *" if modified else self.base_title)
+    
+    def _commit_action(self, status_msg, history_data=None):
+        """完成一次编辑操作：记录历史、标记为已修改并显示状态栏消息"""
+        if history_data is not None:
+            self.addHistory(history_data)
+        self.setModified(True)
+        self._status_pending = status_msg
+        self._status_timer.start(16)
 
     def auto_layout(self):
         """应用自动布局算法"""
         auto_layout = advanced.AutoLayoutAlgorithm(self)
-        auto_layout.apply_layout()
+        
+        # 大量移动节点期间关闭场景索引并暂停刷新，结束后统一重建索引，视图整体重绘一次
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        try:
+            with advanced.batch_scene_update(self):
+                auto_layout.apply_layout()
+        finally:
+            self.view.set_index_mode()
 
     def toggle_fold_selected(self):
         """折叠/展开选中节点"""
@@ -1449,96 +1729,40 @@ class FlowchartEditor(QMainWindow):
         toolbar.setMovable(False)
         self.addToolBar(toolbar)
 
-        # 返回主页按钮
-        home_button = QPushButton("返回主页")
-        home_button.setToolTip("返回主页面")
-        home_button.clicked.connect(self.showWelcomePage)
-        toolbar.addWidget(home_button)
-        
-        toolbar.addSeparator()
-        
-        # 添加节点按钮
-        add_node_button = QPushButton("添加节点")
-        add_node_button.setToolTip("添加新节点")
-        add_node_button.clicked.connect(self.addNode)
-        toolbar.addWidget(add_node_button)
-        
-        # 添加中心主题按钮
-        add_center_button = QPushButton("添加中心主题")
-        add_center_button.setToolTip("添加新的中心主题")
-        add_center_button.clicked.connect(lambda: self.addNode(node_type="中心主题"))
-        toolbar.addWidget(add_center_button)
-        
-        # 删除选中项按钮
-        delete_button = QPushButton("删除选中")
-        delete_button.setToolTip("删除选中的节点或连接")
-        delete_button.clicked.connect(self.deleteSelected)
-        toolbar.addWidget(delete_button)
-        
-        # 线条样式按钮
-        line_style_button = QPushButton("线条样式")
-        line_style_button.setToolTip("设置选中连接线的样式")
-        line_style_button.clicked.connect(self.setLineStyle)
-        toolbar.addWidget(line_style_button)
-        
-        toolbar.addSeparator()
-        
-        # 文件操作按钮
-        new_button = QPushButton("新建")
-        new_button.setToolTip("创建新的思维导图")
-        new_button.clicked.connect(self.newFlowchart)
-        toolbar.addWidget(new_button)
-        
-        open_button = QPushButton("打开")
-        open_button.setToolTip("打开现有思维导图")
-        open_button.clicked.connect(self.openFlowchart)
-        toolbar.addWidget(open_button)
-        
-        save_button = QPushButton("保存")
-        save_button.setToolTip("保存当前思维导图")
-        save_button.clicked.connect(lambda: save_functions.save_flowchart(self))
-        toolbar.addWidget(save_button)
-        
-        # 另存为按钮
-        save_as_button = QPushButton("另存为")
-        save_as_button.setToolTip("将当前思维导图另存为新文件")
-        save_as_button.clicked.connect(lambda: save_functions.save_flowchart_as(self))
-        toolbar.addWidget(save_as_button)
-        
-        toolbar.addSeparator()
-        
-        # 导出按钮
-        export_button = QPushButton("导出")
-        export_button.setToolTip("导出为图片或PDF")
-        export_button.clicked.connect(self.exporter.export_flowchart)
-        toolbar.addWidget(export_button)
-        
-        # 自动布局按钮
-        auto_layout_button = QPushButton("自动布局")
-        auto_layout_button.setToolTip("应用自动布局算法")
-        auto_layout_button.clicked.connect(self.auto_layout)
-        toolbar.addWidget(auto_layout_button)
-        
-        # 折叠/展开按钮
-        fold_button = QPushButton("折叠/展开")
-        fold_button.setToolTip("折叠或展开选中节点")
-        fold_button.clicked.connect(self.toggle_fold_selected)
-        toolbar.addWidget(fold_button)
-        
-        toolbar.addSeparator()
-        
-        # 操作历史
-        undo_button = QPushButton("撤销")
-        undo_button.setToolTip("撤销上一步操作")
-        undo_button.clicked.connect(self.undo)
-        toolbar.addWidget(undo_button)
-        
-        redo_button = QPushButton("重做")
-        redo_button.setToolTip("重做上一步操作")
-        redo_button.clicked.connect(self.redo)
-        toolbar.addWidget(redo_button)
-        
-        toolbar.addSeparator()
+        # 工具栏按钮：(文字, 提示, 槽函数)，None表示分隔符
+        buttons = (
+            ("返回主页", "返回主页面", self.showWelcomePage),
+            None,
+            ("添加节点", "添加新节点", self.addNode),
+            ("添加中心主题", "添加新的中心主题", lambda: self.addNode(node_type="中心主题")),
+            ("删除选中", "删除选中的节点或连接", self.deleteSelected),
+            ("线条样式", "设置选中连接线的样式", self.setLineStyle),
+            None,
+            # 文件操作
+            ("新建", "创建新的思维导图", self.newFlowchart),
+            ("打开", "打开现有思维导图", self.openFlowchart),
+            ("保存", "保存当前思维导图", lambda: save_functions.save_flowchart(self)),
+            ("另存为", "将当前思维导图另存为新文件", lambda: save_functions.save_flowchart_as(self)),
+            None,
+            ("导出", "导出为图片或PDF", lambda: self.exporter.export_flowchart()),
+            ("自动布局", "应用自动布局算法", self.auto_layout),
+            ("折叠/展开", "折叠或展开选中节点", self.toggle_fold_selected),
+            None,
+            # 操作历史
+            ("撤销", "撤销上一步操作", self.undo),
+            ("重做", "重做上一步操作", self.redo),
+            None,
+        )
+        
+        for spec in buttons:
+            if spec is None:
+                toolbar.addSeparator()
+                continue
+            text, tip, slot = spec
+            button = QPushButton(text)
+            button.setToolTip(tip)
+            button.clicked.connect(slot)
+            toolbar.addWidget(button)
         
         # 帮助信息
         help_label = QLabel("提示: Ctrl+左键拖动可创建连接线 | 右键点击空白处创建节点")
@@ -1555,25 +1779,14 @@ class FlowchartEditor(QMainWindow):
         # 如果当前不在编辑视图，切换到编辑视图
         if self.central_stack.currentIndex() != 1:
             # 如果有未保存的更改，先提示保存
-            if self.is_modified and self.scene.items():
-                reply = QMessageBox.question(
-                    self, "保存确认", 
-                    "当前思维导图已被修改，是否保存？",
-                    QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
-                    QMessageBox.Save
-                )
-                
-                if reply == QMessageBox.Save:
-                    if not self.saveFlowchart():
-                        return None  # 保存失败，取消操作
-                elif reply == QMessageBox.Cancel:
-                    return None  # 取消操作
+            if self._prompt_save_if_modified() is False:
+                return None  # 保存失败或取消操作
             
             # 创建新的思维导图
             self.newFlowchart(ask_save=False)  # 不再次提示保存
         
         # 如果是空场景，默认创建中心主题
-        if not self.scene.items() and parent_node is None and node_type is None:
+        if not self.scene.node_count and parent_node is None and node_type is None:
             default_type = "中心主题"
         elif node_type:
             default_type = node_type
@@ -1593,17 +1806,15 @@ class FlowchartEditor(QMainWindow):
                 parent_pos = parent_node.scenePos()
                 
                 # 计算该父节点已有的子节点数量
-                child_count = sum(1 for item in self.scene.items() 
-                                 if isinstance(item, FlowchartConnection) and item.start_node == parent_node)
+                child_count = len(parent_node.children)
                 
                 # 根据子节点数量确定位置
                 if parent_node.node_type == "中心主题":
                     # 中心节点的子节点呈环形分布
                     radius = 200
-                    angle = (child_count * 40) % 360  # 每个子节点间隔40度
-                    angle_rad = math.radians(angle)
-                    x = parent_pos.x() + radius * math.cos(angle_rad)
-                    y = parent_pos.y() + radius * math.sin(angle_rad)
+                    cos_a, sin_a = RING_ANGLES[child_count % len(RING_ANGLES)]
+                    x = parent_pos.x() + radius * cos_a
+                    y = parent_pos.y() + radius * sin_a
                     node_pos = QPointF(x, y)
                 else:
                     # 其他节点的子节点呈垂直分布
@@ -1626,7 +1837,7 @@ class FlowchartEditor(QMainWindow):
             node = FlowchartNode(props["node_type"], props["text"], node_pos)
             
             # 如果指定了自定义颜色，则使用自定义颜色
-            if "color" in props and props["color"] != NODE_TYPES[props["node_type"]]["color"]:
+            if "color" in props and props["color"] != node.color:
                 node.color = props["color"]
                 
             self.scene.addItem(node)
@@ -1637,24 +1848,19 @@ class FlowchartEditor(QMainWindow):
                 self.scene.addItem(connection)
             
             # 如果是第一个节点，将视图居中
-            if len(self.scene.items()) <= 2:  # 只有一个节点或一个节点+一个连接
+            if self.scene.node_count == 1:
                 self.view.centerOn(node)
             
-            # 标记为已修改
-            self.setModified(True)
-            
-            # 添加到操作历史
-            self.addHistory({
+            # 添加到操作历史并标记为已修改
+            self._commit_action(f"已添加 {props['node_type']} 节点", {
                 "type": "add_node",
-                "node_id": id(node),
+                "node_id": node.uid,
                 "node_type": props["node_type"],
                 "node_text": props["text"],
                 "node_pos": (node_pos.x(), node_pos.y()),
-                "parent_node_id": id(parent_node) if parent_node else None
+                "parent_node_id": parent_node.uid if parent_node else None
             })
             
-            self.statusBar().showMessage(f"已添加 {props['node_type']} 节点")
-            
             # 返回创建的节点，便于连续添加子节点
             return node
         
@@ -1685,7 +1891,7 @@ class FlowchartEditor(QMainWindow):
                 # 记录节点信息
                 node_data = {
                     "item_type": "node",
-                    "node_id": id(item),
+                    "node_id": item.uid,
                     "node_type": item.node_type,
                     "node_text": item.node_text,
                     "node_pos": (item.scenePos().x(), item.scenePos().y()),
@@ -1695,10 +1901,10 @@ class FlowchartEditor(QMainWindow):
                 
                 # 记录连接信息
                 for conn in item.connections:
-                    if conn in self.scene.items():  # 确保连接还存在
+                    if conn.scene() is self.scene:  # 确保连接还存在
                         conn_data = {
-                            "start_node_id": id(conn.start_node),
-                            "end_node_id": id(conn.end_node),
+                            "start_node_id": conn.start_node.uid,
+                            "end_node_id": conn.end_node.uid,
                             "color": conn.color.name()
                         }
                         node_data["connections"].append(conn_data)
@@ -1709,20 +1915,15 @@ class FlowchartEditor(QMainWindow):
                 # 记录连接信息
                 conn_data = {
                     "item_type": "connection",
-                    "start_node_id": id(item.start_node),
-                    "end_node_id": id(item.end_node),
+                    "start_node_id": item.start_node.uid,
+                    "end_node_id": item.end_node.uid,
                     "color": item.color.name()
                 }
                 history_data["items"].append(conn_data)
                 item.deleteConnection()
         
-        # 添加到历史记录
-        self.addHistory(history_data)
-        
-        # 标记为已修改
-        self.setModified(True)
-        
-        self.statusBar().showMessage("已删除选中项")
+        # 添加到历史记录并标记为已修改
+        self._commit_action("已删除选中项", history_data)
     
     def setLineStyle(self):
         """设置选中连接线的样式"""
@@ -1801,49 +2002,41 @@ class FlowchartEditor(QMainWindow):
                 "connections": []
             }
             
-            # 应用样式到所有选中的连接线
-            for conn in selected_connections:
-                # 记录原始样式
-                history_data["connections"].append({
-                    "connection_id": id(conn),
-                    "old_color": conn.color.name(),
-                    "old_width": conn.pen().width(),
-                    "new_color": color.name(),
-                    "new_width": width_slider.value()
-                })
-                
-                # 设置新样式
-                conn.color = color
-                pen = conn.pen()
-                pen.setColor(color)
-                pen.setWidth(width_slider.value())
-                conn.setPen(pen)
-                conn.update()
-            
-            # 添加到历史记录
-            self.addHistory(history_data)
-            
-            # 标记为已修改
-            self.setModified(True)
+            # 应用样式到所有选中的连接线，批量修改期间暂停刷新，结束后视图整体重绘一次
+            with advanced.batch_scene_update(self):
+                for conn in selected_connections:
+                    # 记录原始样式
+                    history_data["connections"].append({
+                        "connection_id": conn.uid,
+                        "old_color": conn.color.name(),
+                        "old_width": conn.pen().width(),
+                        "new_color": color.name(),
+                        "new_width": width_slider.value()
+                    })
+                    
+                    # 设置新样式
+                    conn.set_style(color, width_slider.value())
             
-            self.statusBar().showMessage("已更新连接线样式")
+            # 添加到历史记录并标记为已修改
+            self._commit_action("已更新连接线样式", history_data)
     
     def addHistory(self, data):
         """添加操作历史"""
         # 如果当前不在最新状态，删除之后的历史
-        if self.history_index < len(self.history) - 1:
-            self.history = self.history[:self.history_index + 1]
+        while len(self.history) > self.history_index + 1:
+            self.history.pop()
         
-        # 添加新的历史记录
+        # 添加新的历史记录，超过最大限制时deque自动删除最早的记录
         self.history.append(data)
         
-        # 如果历史记录超过最大限制，删除最早的记录
-        if len(self.history) > self.max_history:
-            self.history.pop(0)
-        
         # 更新历史索引
         self.history_index = len(self.history) - 1
     
+    def _find_item(self, item_id, item_type):
+        """按编号查找场景中的节点或连接线，不存在或类型不符时返回None"""
+        item = self.scene.items_by_id.get(item_id)
+        return item if isinstance(item, item_type) else None
+    
     def undo(self):
         """撤销上一步操作"""
         if self.history_index < 0:
@@ -1856,157 +2049,67 @@ class FlowchartEditor(QMainWindow):
         # 根据操作类型执行撤销
         if data["type"] == "add_node":
             # 撤销添加节点操作，删除该节点
-            for item in self.scene.items():
-                if isinstance(item, FlowchartNode) and id(item) == data["node_id"]:
-                    item.deleteNode()
-                    break
+            node = self._find_item(data["node_id"], FlowchartNode)
+            if node:
+                node.deleteNode()
         elif data["type"] == "delete_items":
             # 撤销删除操作，恢复删除的项目
-            # 先恢复节点
-            nodes = {}
-            for item_data in data["items"]:
-                if item_data["item_type"] == "node":
-                    # 创建节点
-                    pos = QPointF(item_data["node_pos"][0], item_data["node_pos"][1])
-                    node = FlowchartNode(item_data["node_type"], item_data["node_text"], pos)
-                    node.color = QColor(item_data["node_color"])
-                    self.scene.addItem(node)
-                    nodes[item_data["node_id"]] = node
-            
-            # 再恢复连接
-            for item_data in data["items"]:
-                if item_data["item_type"] == "node":
-                    # 恢复该节点的连接
-                    for conn_data in item_data["connections"]:
+            # 批量恢复期间暂停刷新，结束后视图整体重绘一次
+            with advanced.batch_scene_update(self):
+                # 先恢复节点
+                nodes = {}
+                for item_data in data["items"]:
+                    if item_data["item_type"] == "node":
+                        # 创建节点
+                        pos = QPointF(item_data["node_pos"][0], item_data["node_pos"][1])
+                        node = FlowchartNode(item_data["node_type"], item_data["node_text"], pos)
+                        node.uid = item_data["node_id"]  # 沿用原节点的编号，之后的重做仍能找到它
+                        node.color = color_from_name(item_data["node_color"])
+                        self.scene.addItem(node)
+                        nodes[item_data["node_id"]] = node
+                
+                # 再恢复连接
+                for item_data in data["items"]:
+                    if item_data["item_type"] == "node":
+                        # 恢复该节点的连接
+                        for conn_data in item_data["connections"]:
+                            # 检查起点和终点是否存在
+                            start_node = nodes.get(conn_data["start_node_id"])
+                            end_node = nodes.get(conn_data["end_node_id"])
+                            
+                            if start_node and end_node and start_node != end_node:
+                                conn = FlowchartConnection(start_node, end_node, color=color_from_name(conn_data["color"]))
+                                self.scene.addItem(conn)
+                    elif item_data["item_type"] == "connection":
                         # 检查起点和终点是否存在
-                        start_node = nodes.get(conn_data["start_node_id"])
-                        end_node = nodes.get(conn_data["end_node_id"])
+                        start_node = self._find_item(item_data["start_node_id"], FlowchartNode)
+                        end_node = self._find_item(item_data["end_node_id"], FlowchartNode)
                         
                         if start_node and end_node and start_node != end_node:
-                            conn = FlowchartConnection(start_node, end_node)
-                            conn.color = QColor(conn_data["color"])
-                            pen = conn.pen()
-                            pen.setColor(conn.color)
-                            conn.setPen(pen)
+                            conn = FlowchartConnection(start_node, end_node, color=color_from_name(item_data["color"]))
                             self.scene.addItem(conn)
-                elif item_data["item_type"] == "connection":
-                    # 当前场景中的节点
-                    scene_nodes = {id(node): node for node in self.scene.items() 
-                                   if isinstance(node, FlowchartNode)}
-                    
-                    # 检查起点和终点是否存在
-                    start_node = scene_nodes.get(item_data["start_node_id"])
-                    end_node = scene_nodes.get(item_data["end_node_id"])
-                    
-                    if start_node and end_node and start_node != end_node:
-                        conn = FlowchartConnection(start_node, end_node)
-                        conn.color = QColor(item_data["color"])
-                        pen = conn.pen()
-                        pen.setColor(conn.color)
-                        conn.setPen(pen)
-                        self.scene.addItem(conn)
         elif data["type"] == "change_line_style":
             # 撤销样式更改，恢复原始样式
-            for conn_data in data["connections"]:
-                # 在场景中查找连接
-                for item in self.scene.items():
-                    if isinstance(item, FlowchartConnection) and id(item) == conn_data["connection_id"]:
+            # 批量修改期间暂停刷新，结束后视图整体重绘一次
+            with advanced.batch_scene_update(self):
+                for conn_data in data["connections"]:
+                    # 在场景中查找连接
+                    item = self._find_item(conn_data["connection_id"], FlowchartConnection)
+                    if item:
                         # 恢复原始样式
-                        item.color = QColor(conn_data["old_color"])
-                        pen = item.pen()
-                        pen.setColor(item.color)
-                        pen.setWidth(conn_data["old_width"])
-                        item.setPen(pen)
-                        item.update()
-                        break
+                        item.set_style(color_from_name(conn_data["old_color"]), conn_data["old_width"])
         
         # 更新历史索引
         self.history_index -= 1
         
         # 标记为已修改
-        self.setModified(True)
-        
-        self.statusBar().showMessage("已撤销上一步操作")
-    
-    def redo(self):
-        """重做上一步操作"""
-        if self.history_index >= len(self.history) - 1:
-            self.statusBar().showMessage("没有可重做的操作")
-            return
-        
-        # 更新历史索引
-        self.history_index += 1
-        
-        # 获取当前历史记录
-        data = self.history[self.history_index]
-        
-        # 根据操作类型执行重做
-        if data["type"] == "add_node":
-            # 重做添加节点操作
-            pos = QPointF(data["node_pos"][0], data["node_pos"][1])
-            node = FlowchartNode(data["node_type"], data["node_text"], pos)
-            self.scene.addItem(node)
-            
-            # 如果有父节点，创建连接
-            if data["parent_node_id"]:
-                for item in self.scene.items():
-                    if isinstance(item, FlowchartNode) and id(item) == data["parent_node_id"]:
-                        conn = FlowchartConnection(item, node)
-                        self.scene.addItem(conn)
-                        break
-        elif data["type"] == "delete_items":
-            # 重做删除操作，删除项目
-            for item_data in data["items"]:
-                if item_data["item_type"] == "node":
-                    # 删除节点
-                    for item in self.scene.items():
-                        if isinstance(item, FlowchartNode) and id(item) == item_data["node_id"]:
-                            item.deleteNode()
-                            break
-                elif item_data["item_type"] == "connection":
-                    # 删除连接
-                    for item in self.scene.items():
-                        if isinstance(item, FlowchartConnection) and \
-                           id(item.start_node) == item_data["start_node_id"] and \
-                           id(item.end_node) == item_data["end_node_id"]:
-                            item.deleteConnection()
-                            break
-        elif data["type"] == "change_line_style":
-            # 重做样式更改
-            for conn_data in data["connections"]:
-                # 在场景中查找连接
-                for item in self.scene.items():
-                    if isinstance(item, FlowchartConnection) and id(item) == conn_data["connection_id"]:
-                        # 应用新样式
-                        item.color = QColor(conn_data["new_color"])
-                        pen = item.pen()
-                        pen.setColor(item.color)
-                        pen.setWidth(conn_data["new_width"])
-                        item.setPen(pen)
-                        item.update()
-                        break
-        
-        # 标记为已修改
-        self.setModified(True)
-        
-        self.statusBar().showMessage("已重做操作")
+        self._commit_action("已撤销上一步操作")
     
     def showWelcomePage(self):
         """返回欢迎页面"""
         # 如果有未保存的更改，先提示保存
-        if self.is_modified and self.scene.items():
-            reply = QMessageBox.question(
-                self, "保存确认", 
-                "当前思维导图已被修改，是否保存？",
-                QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
-                QMessageBox.Save
-            )
-            
-            if reply == QMessageBox.Save:
-                if not self.saveFlowchart():
-                    return  # 保存失败，取消操作
-            elif reply == QMessageBox.Cancel:
-                return  # 取消操作
+        if self._prompt_save_if_modified() is False:
+            return  # 保存失败或取消操作
         
         # 切换到欢迎页面
         self.central_stack.setCurrentIndex(0)
@@ -2019,26 +2122,15 @@ class FlowchartEditor(QMainWindow):
             ask_save: 是否在有未保存更改时提示保存
         """
         # 如果有未保存的更改，先提示保存
-        if ask_save and self.is_modified and self.scene.items():
-            reply = QMessageBox.question(
-                self, "保存确认", 
-                "当前思维导图已被修改，是否保存？",
-                QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
-                QMessageBox.Save
-            )
-            
-            if reply == QMessageBox.Save:
-                if not self.saveFlowchart():
-                    return False  # 保存失败，取消操作
-            elif reply == QMessageBox.Cancel:
-                return False  # 取消操作
+        if ask_save and self._prompt_save_if_modified() is False:
+            return False  # 保存失败或取消操作
         
         # 清空场景
         self.scene.clear()
         self.current_file = None
         
         # 重置历史记录
-        self.history = []
+        self.history.clear()
         self.history_index = -1
         
         # 重置修改状态
@@ -2053,23 +2145,12 @@ class FlowchartEditor(QMainWindow):
     def openFlowchart(self):
         """打开思维导图文件"""
         # 如果有未保存的更改，先提示保存
-        if self.is_modified and self.scene.items():
-            reply = QMessageBox.question(
-                self, "保存确认", 
-                "当前思维导图已被修改，是否保存？",
-                QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
-                QMessageBox.Save
-            )
-            
-            if reply == QMessageBox.Save:
-                if not self.saveFlowchart():
-                    return  # 保存失败，取消操作
-            elif reply == QMessageBox.Cancel:
-                return  # 取消操作
+        if self._prompt_save_if_modified() is False:
+            return  # 保存失败或取消操作
         
         # 选择文件
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "打开思维导图", "", "思维导图文件 (*.flow *.mindmap *.mm *.xmind);;JSON文件 (*.json);;All Files (*)"
+            self, "打开思维导图", "", "思维导图文件 (*.flow *.flowb *.mindmap *.mm *.xmind);;JSON文件 (*.json);;All Files (*)"
         )
         
         if not file_path:
@@ -2082,76 +2163,43 @@ class FlowchartEditor(QMainWindow):
             # 根据文件扩展名选择不同的处理方式
             file_ext = os.path.splitext(file_path)[1].lower()
             
-            if file_ext == '.flow':
+            if save_functions.is_binary_flowchart(file_path):
+                # 二进制格式，按文件头识别，与扩展名无关
+                data = save_functions.load_binary_flowchart(file_path)
+            elif file_ext == '.flow' and ijson is not None:
+                # 处理我们自己的格式，边解析边创建节点和连接线
+                data = _iter_json_arrays(file_path, ("nodes", "connections"))
+            elif file_ext == '.flow':
                 # 处理我们自己的格式
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = _load_json_file(file_path)
             elif file_ext in ['.mindmap', '.mm', '.xmind']:
                 # 处理其他思维导图格式
                 data = self._convert_external_mindmap(file_path, file_ext)
             elif file_ext == '.json':
                 # 处理JSON格式
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = _load_json_file(file_path)
                 # 检查JSON是否有我们需要的结构
                 if "nodes" not in data or "connections" not in data:
                     # 尝试转换为我们的格式
                     data = self._convert_general_json(data)
             else:
                 # 尝试常规方式加载
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            
-            # 设置当前文件路径
-            self.current_file = file_path
+                data = _load_json_file(file_path)
             
-            # 首先创建节点
-            nodes = {}
-            for node_data in data["nodes"]:
-                # 兼容不同的坐标字段命名
-                x = node_data.get("pos_x", node_data.get("x", 0))
-                y = node_data.get("pos_y", node_data.get("y", 0))
-                pos = QPointF(x, y)
-                
-                # 兼容不同的文本字段命名
-                text = node_data.get("text", node_data.get("content", node_data.get("title", "")))
-                
-                # 兼容不同的类型字段命名
-                node_type = node_data.get("type", node_data.get("node_type", "主要分支"))
-                
-                node = FlowchartNode(node_type, text, pos)
-                if "color" in node_data:
-                    node.color = QColor(node_data["color"])
-                self.scene.addItem(node)
-                nodes[node_data["id"]] = node
+            # 批量添加图元期间关闭场景索引并暂停刷新，添加完成后再统一建立索引，视图整体重绘一次
+            # 流式解析时文件中的错误要到这里才会抛出
+            self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+            try:
+                with advanced.batch_scene_update(self):
+                    self._populate_scene(data)
+            finally:
+                self.view.set_index_mode()
             
-            # 然后创建连接
-            for conn_data in data["connections"]:
-                # 兼容不同的连接端点ID字段命名
-                start_id = conn_data.get("start_id", conn_data.get("start", conn_data.get("from", "")))
-                end_id = conn_data.get("end_id", conn_data.get("end", conn_data.get("to", "")))
-                
-                if start_id in nodes and end_id in nodes:
-                    start_node = nodes[start_id]
-                    end_node = nodes[end_id]
-                    conn = FlowchartConnection(start_node, end_node)
-                    
-                    # 兼容不同的颜色字段命名
-                    color_value = conn_data.get("color", conn_data.get("line_color", conn_data.get("stroke", "#000000")))
-                    conn.color = QColor(color_value)
-                    
-                    pen = conn.pen()
-                    pen.setColor(conn.color)
-                    
-                    # 兼容不同的宽度字段命名
-                    width_value = conn_data.get("width", conn_data.get("line_width", conn_data.get("stroke_width", 2)))
-                    pen.setWidth(width_value)
-                    
-                    conn.setPen(pen)
-                    self.scene.addItem(conn)
+            # 全部读取成功后才设置当前文件路径，避免之后保存时用不完整的内容覆盖原文件
+            self.current_file = file_path
             
             # 重置历史记录
-            self.history = []
+            self.history.clear()
             self.history_index = -1
             
             # 重置修改状态
@@ -2166,25 +2214,59 @@ class FlowchartEditor(QMainWindow):
             self.statusBar().showMessage(f"已打开思维导图: {os.path.basename(file_path)}")
             
         except Exception as e:
+            # 不保留读取了一部分的内容；原来的内容已被清空，也不再关联之前的文件
+            self.scene.clear()
+            self.current_file = None
             QMessageBox.critical(self, "错误", f"打开文件时发生错误: {str(e)}")
             return
     
+    def _populate_scene(self, data):
+        """根据读取到的数据创建节点和连接线"""
+        # 首先创建节点
+        nodes = {}
+        for node_data in data["nodes"]:
+            # 兼容不同的坐标字段命名
+            x = node_data.get("pos_x", node_data.get("x", 0))
+            y = node_data.get("pos_y", node_data.get("y", 0))
+            pos = QPointF(x, y)
+            
+            # 兼容不同的文本字段命名
+            text = node_data.get("text", node_data.get("content", node_data.get("title", "")))
+            
+            # 兼容不同的类型字段命名
+            node_type = node_data.get("type", node_data.get("node_type", "主要分支"))
+            
+            node = FlowchartNode(node_type, text, pos)
+            if "color" in node_data:
+                node.color = color_from_name(node_data["color"])
+            self.scene.addItem(node)
+            nodes[node_data["id"]] = node
+        
+        # 然后创建连接
+        for conn_data in data["connections"]:
+            # 兼容不同的连接端点ID字段命名
+            start_id = conn_data.get("start_id", conn_data.get("start", conn_data.get("from", "")))
+            end_id = conn_data.get("end_id", conn_data.get("end", conn_data.get("to", "")))
+            
+            if start_id in nodes and end_id in nodes:
+                start_node = nodes[start_id]
+                end_node = nodes[end_id]
+                
+                # 兼容不同的颜色字段命名
+                color_value = conn_data.get("color", conn_data.get("line_color", conn_data.get("stroke", "#000000")))
+                
+                # 兼容不同的宽度字段命名
+                width_value = conn_data.get("width", conn_data.get("line_width", conn_data.get("stroke_width", 2)))
+                
+                # 创建时直接使用保存的样式，只设置一次画笔
+                conn = FlowchartConnection(start_node, end_node, color=color_from_name(color_value), width=width_value)
+                self.scene.addItem(conn)
+    
     def showWelcomePage(self):
         """返回欢迎页面"""
         # 如果有未保存的更改，先提示保存
-        if self.is_modified and self.scene.items():
-            reply = QMessageBox.question(
-                self, "保存确认", 
-                "当前思维导图已被修改，是否保存？",
-                QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
-                QMessageBox.Save
-            )
-            
-            if reply == QMessageBox.Save:
-                if not self.saveFlowchart():
-                    return  # 保存失败，取消操作
-            elif reply == QMessageBox.Cancel:
-                return  # 取消操作
+        if self._prompt_save_if_modified() is False:
+            return  # 保存失败或取消操作
         
         # 切换到欢迎页面
         self.central_stack.setCurrentIndex(0)
@@ -2207,51 +2289,44 @@ class FlowchartEditor(QMainWindow):
             # 重做添加节点操作
             pos = QPointF(data["node_pos"][0], data["node_pos"][1])
             node = FlowchartNode(data["node_type"], data["node_text"], pos)
+            node.uid = data["node_id"]  # 沿用原节点的编号，之后的撤销仍能找到它
             self.scene.addItem(node)
             
             # 如果有父节点，创建连接
             if data["parent_node_id"]:
-                for item in self.scene.items():
-                    if isinstance(item, FlowchartNode) and id(item) == data["parent_node_id"]:
-                        conn = FlowchartConnection(item, node)
-                        self.scene.addItem(conn)
-                        break
+                parent_node = self._find_item(data["parent_node_id"], FlowchartNode)
+                if parent_node:
+                    conn = FlowchartConnection(parent_node, node)
+                    self.scene.addItem(conn)
         elif data["type"] == "delete_items":
             # 重做删除操作，删除项目
             for item_data in data["items"]:
                 if item_data["item_type"] == "node":
                     # 删除节点
-                    for item in self.scene.items():
-                        if isinstance(item, FlowchartNode) and id(item) == item_data["node_id"]:
-                            item.deleteNode()
-                            break
+                    node = self._find_item(item_data["node_id"], FlowchartNode)
+                    if node:
+                        node.deleteNode()
                 elif item_data["item_type"] == "connection":
-                    # 删除连接
-                    for item in self.scene.items():
-                        if isinstance(item, FlowchartConnection) and \
-                           id(item.start_node) == item_data["start_node_id"] and \
-                           id(item.end_node) == item_data["end_node_id"]:
-                            item.deleteConnection()
-                            break
+                    # 删除连接（在起点的连接列表中查找）
+                    start_node = self._find_item(item_data["start_node_id"], FlowchartNode)
+                    if start_node:
+                        for conn in start_node.connections:
+                            if conn.start_node is start_node and conn.end_node.uid == item_data["end_node_id"]:
+                                conn.deleteConnection()
+                                break
         elif data["type"] == "change_line_style":
             # 重做样式更改
-            for conn_data in data["connections"]:
-                # 在场景中查找连接
-                for item in self.scene.items():
-                    if isinstance(item, FlowchartConnection) and id(item) == conn_data["connection_id"]:
+            # 批量修改期间暂停刷新，结束后视图整体重绘一次
+            with advanced.batch_scene_update(self):
+                for conn_data in data["connections"]:
+                    # 在场景中查找连接
+                    item = self._find_item(conn_data["connection_id"], FlowchartConnection)
+                    if item:
                         # 应用新样式
-                        item.color = QColor(conn_data["new_color"])
-                        pen = item.pen()
-                        pen.setColor(item.color)
-                        pen.setWidth(conn_data["new_width"])
-                        item.setPen(pen)
-                        item.update()
-                        break
+                        item.set_style(color_from_name(conn_data["new_color"]), conn_data["new_width"])
         
         # 标记为已修改
-        self.setModified(True)
-        
-        self.statusBar().showMessage("已重做操作")
+        self._commit_action("已重做操作")
 
 def openFlowchart(self):
     """打开思维导图文件"""
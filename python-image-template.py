@@ -3,7 +3,6 @@
 
 import os
 import sys
-import time
 import datetime
 import platform
 import subprocess
@@ -11,56 +10,214 @@ from pathlib import Path
 import shutil
 from PIL import Image, ExifTags
 import io
+import hashlib
+import threading
+from collections import OrderedDict
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QPushButton, QFileDialog, QTreeView, QListWidget,
                              QListWidgetItem, QSplitter, QMenu, QAction, QMessageBox,
                              QFileSystemModel, QAbstractItemView, QScrollArea, QGroupBox,
                              QFormLayout, QLineEdit, QComboBox, QInputDialog)
-from PyQt5.QtCore import Qt, QDir, QSize, QModelIndex, QRect, QThread, pyqtSignal
+from PyQt5.QtCore import (Qt, QDir, QSize, QModelIndex, QRect, QObject, QRunnable, QThreadPool,
+                          QTimer, pyqtSignal)
 from PyQt5.QtGui import QPixmap, QIcon, QImageReader, QImage, QPalette, QColor
 
+# 支持的图片扩展名
+IMAGE_EXTENSIONS = frozenset(['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'])
 
-class ImageLoader(QThread):
-    """图片加载线程，用于异步加载图片缩略图"""
-    image_loaded = pyqtSignal(int, QPixmap)  # 图片加载完成信号，参数为索引和图片
+# 缩略图磁盘缓存目录，再次浏览同一文件夹时不必重新解码原图
+THUMBNAIL_CACHE_DIR = os.path.join(str(Path.home()), '.cache', 'pyqt-imgview')
+# 缩略图缓存的总大小上限（字节），超过后删除最旧的缓存文件
+THUMBNAIL_CACHE_LIMIT = 200 * 1024 * 1024
+
+
+def thumbnail_cache_path(file_path, thumbnail_size):
+    """根据图片路径、修改时间、文件大小和缩略图尺寸生成缓存文件路径"""
+    stat = os.stat(file_path)
+    key = hashlib.sha1(os.path.abspath(file_path).encode('utf-8', 'surrogateescape')).hexdigest()
+    width, height = thumbnail_size
+    return os.path.join(
+        THUMBNAIL_CACHE_DIR, f"{key}_{stat.st_mtime_ns}_{stat.st_size}_{width}x{height}.png"
+    )
+
+
+def prune_thumbnail_cache(limit=THUMBNAIL_CACHE_LIMIT):
+    """缓存总大小超过上限时，按修改时间从旧到新删除缓存文件，直到降到上限的80%以下"""
+    try:
+        entries = []
+        total = 0
+        with os.scandir(THUMBNAIL_CACHE_DIR) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+    except OSError:
+        return
+    
+    if total <= limit:
+        return
+    
+    entries.sort()
+    target = limit * 0.8
+    for _, size, path in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def read_scaled_image(reader, width, height):
+    """用QImageReader按目标尺寸解码，JPEG等格式不必先解码整张原图"""
+    reader.setAutoTransform(True)  # 按EXIF信息旋转
+    
+    size = reader.size()
+    if size.isValid():
+        # 与PIL的thumbnail一样只缩小不放大
+        if size.width() > width or size.height() > height:
+            size.scale(width, height, Qt.KeepAspectRatio)
+            reader.setScaledSize(size)
+        return reader.read()
+    
+    image = reader.read()
+    if not image.isNull() and (image.width() > width or image.height() > height):
+        image = image.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+class ImageLoader(QObject):
+    """图片加载器，在线程池中并行加载图片缩略图"""
+    images_loaded = pyqtSignal(list)  # 一批图片加载完成信号，参数为[(索引, 图片), ...]
+    
+    FLUSH_INTERVAL = 100  # 汇总发送加载结果的间隔（毫秒）
     
     def __init__(self, file_paths, thumbnail_size):
         super().__init__()
         self.file_paths = file_paths
         self.thumbnail_size = thumbnail_size
         self.running = True
+        
+        # 每个加载器使用自己的线程池，停止时只需等待自己的任务
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(os.cpu_count() or 1)
+        
+        # 工作线程把结果放入pending，由界面线程的定时器定期取出一起发送
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.created_count = 0  # 新写入缓存的缩略图数量，全部加载完成后据此决定是否清理缓存
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self.flush)
     
-    def run(self):
+    def start(self):
+        """为每张图片提交一个加载任务"""
         for i, file_path in enumerate(self.file_paths):
-            if not self.running:
-                break
-                
-            try:
-                # 使用PIL加载图片并创建缩略图
-                img = Image.open(file_path)
-                img.thumbnail(self.thumbnail_size)
-                
-                # 转换为QPixmap
-                img_data = io.BytesIO()
-                img_format = img.format if img.format else 'PNG'
-                img.save(img_data, format=img_format)
-                pixmap = QPixmap()
-                pixmap.loadFromData(img_data.getvalue())
-                
-                # 发送信号
-                self.image_loaded.emit(i, pixmap)
-            except Exception as e:
-                print(f"加载图片 {file_path} 失败: {e}")
+            self.pool.start(ThumbnailTask(self, i, file_path))
+        self.flush_timer.start()
+    
+    def flush(self):
+        """发送已加载完成的图片，全部完成后停止定时器"""
+        # 先判断是否全部完成再取结果，避免漏掉最后完成的任务
+        finished = self.pool.activeThreadCount() == 0
+        with self.pending_lock:
+            batch, self.pending = self.pending, []
+        if batch:
+            self.images_loaded.emit(batch)
+        if finished:
+            self.flush_timer.stop()
+            if self.created_count:
+                # 缓存有新增时在后台检查总大小，避免缓存无限增长
+                threading.Thread(target=prune_thumbnail_cache, daemon=True).start()
+    
+    def load(self, index, file_path):
+        """加载单张图片的缩略图（在线程池中执行）"""
+        if not self.running:
+            return
+        
+        try:
+            # 缓存命中时直接读取缩略图，不必重新解码原图
+            cache_path = thumbnail_cache_path(file_path, self.thumbnail_size)
+            image = QImage()
+            if not image.load(cache_path):
+                image = self.create_thumbnail(file_path, cache_path)
             
-            # 给UI线程一些时间处理
-            time.sleep(0.01)
+            # 交给界面线程汇总发送，QPixmap只能在界面线程中创建
+            if self.running:
+                with self.pending_lock:
+                    self.pending.append((index, image))
+        except Exception as e:
+            print(f"加载图片 {file_path} 失败: {e}")
+    
+    def create_thumbnail(self, file_path, cache_path):
+        """创建缩略图并写入缓存"""
+        image = self.read_scaled(file_path)
+        if image.isNull():
+            # Qt不支持的格式再交给PIL处理
+            image = self.read_with_pil(file_path)
+        
+        try:
+            # 先写临时文件再替换，避免留下不完整的缓存
+            os.makedirs(THUMBNAIL_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            if image.save(tmp_path, 'PNG'):
+                os.replace(tmp_path, cache_path)
+                with self.pending_lock:
+                    self.created_count += 1
+        except OSError:
+            pass
+        
+        return image
+    
+    def read_scaled(self, file_path):
+        """按缩略图尺寸解码图片"""
+        return read_scaled_image(QImageReader(file_path), *self.thumbnail_size)
+    
+    def read_with_pil(self, file_path):
+        """使用PIL创建缩略图"""
+        img = Image.open(file_path)
+        img.thumbnail(self.thumbnail_size)
+        if img.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+            img = img.convert('RGBA')
+        
+        # 转换为QImage
+        img_data = io.BytesIO()
+        img.save(img_data, format='PNG')
+        return QImage.fromData(img_data.getvalue())
+    
+    def isRunning(self):
+        return self.pool.activeThreadCount() > 0
     
     def stop(self):
         self.running = False
+        self.pool.clear()  # 丢弃还没开始的任务
+        self.flush_timer.stop()
+    
+    def wait(self):
+        self.pool.waitForDone()
+
+
+class ThumbnailTask(QRunnable):
+    """线程池中加载单张缩略图的任务"""
+    
+    def __init__(self, loader, index, file_path):
+        super().__init__()
+        self.loader = loader
+        self.index = index
+        self.file_path = file_path
+    
+    def run(self):
+        self.loader.load(self.index, self.file_path)
 
 
 class ImageViewer(QMainWindow):
+    ITEM_SIZE = QSize(170, 190)  # 图片列表项大小
+    PREVIEW_SIZE = QSize(300, 200)  # 详情预览图大小
+    PREVIEW_CACHE_SIZE = 32  # 最多缓存的预览图数量
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle('图片管理工具')
@@ -94,6 +251,14 @@ class ImageViewer(QMainWindow):
         self.current_images = []
         self.image_loader = None
         
+        # 缩略图加载完成前所有列表项共用一个透明占位图标
+        placeholder = QPixmap(150, 150)
+        placeholder.fill(Qt.transparent)
+        self.placeholder_icon = QIcon(placeholder)
+        
+        # 最近查看过的图片详情：(路径, 修改时间) -> (宽, 高, 格式, 预览图)
+        self.preview_cache = OrderedDict()
+        
         # 状态栏
         self.statusBar().showMessage('准备就绪')
         
@@ -102,6 +267,8 @@ class ImageViewer(QMainWindow):
         if os.path.exists(default_dir):
             self.folder_model.setRootPath(default_dir)
             self.folder_view.setRootIndex(self.folder_model.index(default_dir))
+        else:
+            self.folder_model.setRootPath('')
     
     def create_folder_panel(self):
         # 创建左侧文件夹面板
@@ -116,7 +283,10 @@ class ImageViewer(QMainWindow):
         # 文件夹树
         self.folder_model = QFileSystemModel()
         self.folder_model.setFilter(QDir.Dirs | QDir.NoDotAndDotDot)
-        self.folder_model.setRootPath('')
+        # 不读取自定义文件夹图标（Windows上需要逐个读取desktop.ini）
+        if hasattr(QFileSystemModel, 'DontUseCustomDirectoryIcons'):
+            self.folder_model.setOption(QFileSystemModel.DontUseCustomDirectoryIcons, True)
+        # 根路径在__init__中设置，只监视实际显示的目录
         
         self.folder_view = QTreeView()
         self.folder_view.setModel(self.folder_model)
@@ -263,20 +433,21 @@ class ImageViewer(QMainWindow):
             self.image_loader.stop()
             self.image_loader.wait()
         
-        # 获取文件夹中的所有图片
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']
+        # 获取文件夹中的所有图片（scandir的目录项自带文件类型，不必逐个stat）
         image_files = []
         
         try:
-            for file in os.listdir(folder_path):
-                file_path = os.path.join(folder_path, file)
-                if os.path.isfile(file_path) and os.path.splitext(file)[1].lower() in image_extensions:
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    if os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS or not entry.is_file():
+                        continue
+                    file_path = entry.path
                     image_files.append(file_path)
                     
                     # 添加到列表，先用占位图
-                    item = QListWidgetItem(file)
-                    item.setIcon(QIcon())
-                    item.setSizeHint(QSize(170, 190))  # 设置项目大小
+                    item = QListWidgetItem(entry.name)
+                    item.setIcon(self.placeholder_icon)
+                    item.setSizeHint(self.ITEM_SIZE)  # 设置项目大小
                     item.setData(Qt.UserRole, file_path)  # 存储文件路径
                     self.image_list.addItem(item)
                     self.current_images.append(file_path)
@@ -287,16 +458,22 @@ class ImageViewer(QMainWindow):
             # 异步加载图片
             if image_files:
                 self.image_loader = ImageLoader(image_files, (150, 150))
-                self.image_loader.image_loaded.connect(self.on_image_loaded)
+                self.image_loader.images_loaded.connect(self.on_images_loaded)
                 self.image_loader.start()
             
         except Exception as e:
             QMessageBox.warning(self, '错误', f'加载文件夹失败: {e}')
     
-    def on_image_loaded(self, index, pixmap):
-        if index < self.image_list.count():
-            item = self.image_list.item(index)
-            item.setIcon(QIcon(pixmap))
+    def on_images_loaded(self, batch):
+        # 一批图标设置完后再统一刷新列表
+        self.image_list.setUpdatesEnabled(False)
+        try:
+            count = self.image_list.count()
+            for index, image in batch:
+                if index < count:
+                    self.image_list.item(index).setIcon(QIcon(QPixmap.fromImage(image)))
+        finally:
+            self.image_list.setUpdatesEnabled(True)
     
     def on_image_clicked(self, item):
         file_path = item.data(Qt.UserRole)
@@ -311,7 +488,8 @@ class ImageViewer(QMainWindow):
         try:
             # 基本文件信息
             file_name = os.path.basename(file_path)
-            file_size = os.path.getsize(file_path)
+            stat = os.stat(file_path)  # 只取一次文件状态
+            file_size = stat.st_size
             
             # 格式化文件大小
             if file_size < 1024:
@@ -323,24 +501,21 @@ class ImageViewer(QMainWindow):
             
             # 获取创建和修改时间
             if platform.system() == 'Windows':
-                created_time = os.path.getctime(file_path)
+                created_time = stat.st_ctime
             else:
                 try:
-                    stat = os.stat(file_path)
                     created_time = stat.st_birthtime  # macOS
                 except AttributeError:
                     created_time = stat.st_mtime  # Linux可能没有创建时间
             
-            modified_time = os.path.getmtime(file_path)
+            modified_time = stat.st_mtime
             
             # 格式化时间
             created_time_str = datetime.datetime.fromtimestamp(created_time).strftime('%Y-%m-%d %H:%M:%S')
             modified_time_str = datetime.datetime.fromtimestamp(modified_time).strftime('%Y-%m-%d %H:%M:%S')
             
-            # 获取图片信息
-            img = Image.open(file_path)
-            width, height = img.size
-            img_format = img.format
+            # 获取图片信息和预览图
+            width, height, img_format, pixmap = self.get_preview(file_path, stat.st_mtime_ns)
             
             # 更新标签
             self.file_name_label.setText(file_name)
@@ -351,20 +526,45 @@ class ImageViewer(QMainWindow):
             self.modification_date_label.setText(modified_time_str)
             
             # 显示预览图
-            preview_size = QSize(300, 200)
-            img.thumbnail((preview_size.width(), preview_size.height()))
-            
-            # 转换为QPixmap
-            img_data = io.BytesIO()
-            img.save(img_data, format=img_format)
-            pixmap = QPixmap()
-            pixmap.loadFromData(img_data.getvalue())
-            
             self.image_preview.setPixmap(pixmap)
             
         except Exception as e:
             QMessageBox.warning(self, '错误', f'加载图片详情失败: {e}')
     
+    def get_preview(self, file_path, mtime):
+        """获取图片的尺寸、格式和预览图，最近查看过且未修改的图片直接使用缓存"""
+        key = (file_path, mtime)
+        cached = self.preview_cache.get(key)
+        if cached is not None:
+            self.preview_cache.move_to_end(key)
+            return cached
+        
+        # QImageReader只解析文件头就能得到尺寸和格式，预览图按目标尺寸解码
+        reader = QImageReader(file_path)
+        size = reader.size()
+        img_format = bytes(reader.format()).decode('ascii', 'ignore').upper()
+        image = read_scaled_image(reader, self.PREVIEW_SIZE.width(), self.PREVIEW_SIZE.height())
+        
+        if size.isValid() and not image.isNull():
+            width, height = size.width(), size.height()
+            pixmap = QPixmap.fromImage(image)
+        else:
+            # Qt不支持的格式再交给PIL处理
+            img = Image.open(file_path)
+            width, height = img.size
+            img_format = img.format
+            img.thumbnail((self.PREVIEW_SIZE.width(), self.PREVIEW_SIZE.height()))
+            img_data = io.BytesIO()
+            img.save(img_data, format='PNG')
+            pixmap = QPixmap()
+            pixmap.loadFromData(img_data.getvalue())
+        
+        result = (width, height, img_format, pixmap)
+        self.preview_cache[key] = result
+        if len(self.preview_cache) > self.PREVIEW_CACHE_SIZE:
+            self.preview_cache.popitem(last=False)
+        return result
+    
     def show_image_context_menu(self, position):
         item = self.image_list.itemAt(position)
         if not item:
@@ -432,9 +632,8 @@ class ImageViewer(QMainWindow):
                 item.setText(new_name)
                 item.setData(Qt.UserRole, new_path)
                 
-                # 更新当前图片列表
-                index = self.current_images.index(file_path)
-                self.current_images[index] = new_path
+                # 更新当前图片列表（与列表项的行号一一对应，不必按路径查找）
+                self.current_images[self.image_list.row(item)] = new_path
                 
                 # 更新详情
                 self.show_image_details(new_path)
@@ -464,8 +663,8 @@ class ImageViewer(QMainWindow):
                 row = self.image_list.row(item)
                 self.image_list.takeItem(row)
                 
-                # 从当前图片列表中移除
-                self.current_images.remove(file_path)
+                # 从当前图片列表中移除（按行号删除，不必按路径查找）
+                del self.current_images[row]
                 
                 # 清空详情
                 self.clear_image_details()
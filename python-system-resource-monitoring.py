@@ -1,13 +1,121 @@
 import sys
+import os
+import time
 import platform
 import psutil
-import subprocess
-import re
+import threading
+from concurrent.futures import Future, wait
+from collections import namedtuple
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, 
                             QLabel, QProgressBar, QHBoxLayout, QGroupBox)
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QEvent, QTimer, QSocketNotifier, QThread, pyqtSignal
 from PyQt5.QtGui import QColor, QPalette
 
+if sys.platform == 'win32':
+    import ctypes.wintypes
+
+# Windows设备变化消息
+WM_DEVICECHANGE = 0x0219
+
+# 字节大小单位，下标i对应1024的i次方
+BYTE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+
+def windows_drives():
+    """返回Windows上存在的盘符列表，GetLogicalDrives一次调用得到所有盘符的位图"""
+    mask = ctypes.windll.kernel32.GetLogicalDrives()
+    return [f"{chr(65 + i)}:\\" for i in range(26) if mask & (1 << i)]
+
+
+# 磁盘信息标签的文本模板
+DISK_INFO_TEMPLATE = "{capacity}\n可用空间: {free}\n已用空间: {used}\n使用率: {percent}%"
+
+# 界面用到的内存字段（计算方式与psutil.virtual_memory()的同名字段一致）
+MemoryInfo = namedtuple('MemoryInfo', 'total used percent')
+
+
+def _meminfo_field(data, name):
+    """从/proc/meminfo的内容中取出一个字段（单位kB），返回字节数"""
+    # 按行首匹配，避免Cached匹配到SwapCached
+    start = data.index(b'\n' + name) + len(name) + 1
+    return int(data[start:data.index(b'\n', start)].split()[0]) * 1024
+
+
+def read_memory():
+    """读取内存使用情况；Linux上直接读/proc/meminfo，只解析需要的几个字段"""
+    if sys.platform.startswith('linux'):
+        try:
+            fd = os.open('/proc/meminfo', os.O_RDONLY)
+            try:
+                data = b'\n' + os.read(fd, 8192)
+            finally:
+                os.close(fd)
+            total = _meminfo_field(data, b'MemTotal:')
+            free = _meminfo_field(data, b'MemFree:')
+            available = _meminfo_field(data, b'MemAvailable:')
+            buffers = _meminfo_field(data, b'Buffers:')
+            cached = _meminfo_field(data, b'Cached:') + _meminfo_field(data, b'SReclaimable:')
+        except (OSError, ValueError):
+            # 旧内核没有MemAvailable等情况交给psutil处理
+            pass
+        else:
+            # 与psutil相同：已用 = 总量 - 空闲 - 缓冲 - 缓存，使用率按可用内存计算
+            used = total - free - buffers - cached
+            if used < 0:
+                used = total - free
+            percent = round((total - available) / total * 100, 1) if total else 0.0
+            return MemoryInfo(total, used, percent)
+    return psutil.virtual_memory()
+
+
+class StatsSampler(QThread):
+    """后台采集线程，按固定间隔调用采集函数并通过信号发送结果"""
+    stats_sampled = pyqtSignal(int, object)  # 采集序号和采集结果，结果内容由采集函数决定
+    
+    def __init__(self, collect, interval, parent=None):
+        super().__init__(parent)
+        self.collect = collect
+        self.interval = interval  # 采集间隔（秒），为None时暂停采集
+        self.running = True
+        self._wake_event = threading.Event()
+        self.sample_count = 0  # 最近一次采集的序号，接收方据此丢弃已过时的结果
+    
+    def run(self):
+        # 按固定的时间点采集，采集本身的耗时不会累积成周期漂移
+        # 第一次采集推迟一个间隔：CPU使用率统计的是两次调用之间的时间，启动后立即采集得到的值没有意义
+        next_time = time.monotonic() + (self.interval or 0)
+        while True:
+            timeout = None
+            if self.interval is not None:
+                timeout = max(0, next_time - time.monotonic())
+            # 等待期间修改间隔或请求停止会立即唤醒，不必等满一个间隔
+            if self._wake_event.wait(timeout):
+                self._wake_event.clear()
+                next_time = time.monotonic()
+            if not self.running:
+                break
+            if self.interval is None:
+                continue
+            
+            stats = self.collect()
+            self.sample_count += 1
+            self.stats_sampled.emit(self.sample_count, stats)
+            next_time += self.interval
+            if next_time < time.monotonic():
+                # 已经错过了下一个时间点，不补采，从现在重新计时
+                next_time = time.monotonic()
+    
+    def set_interval(self, interval):
+        """修改采集间隔，None表示暂停；间隔有变化时立即采集一次"""
+        if interval != self.interval:
+            self.interval = interval
+            self._wake_event.set()
+    
+    def stop(self):
+        """请求线程停止"""
+        self.running = False
+        self._wake_event.set()
+
 
 class SystemMonitor(QMainWindow):
     def __init__(self):
@@ -15,6 +123,9 @@ class SystemMonitor(QMainWindow):
         self.setWindowTitle('系统资源监控')
         self.setMinimumSize(600, 500)  # 增加窗口大小以适应更多内容
         
+        # 先调用一次作为起点，之后每次得到的是距上次调用期间的CPU使用率
+        psutil.cpu_percent(interval=None)
+        
         # 设置主窗口部件
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -36,17 +147,47 @@ class SystemMonitor(QMainWindow):
         # 添加磁盘使用情况
         self.setup_disk_usage()
         
-        # 更新定时器
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_stats)
-        self.timer.start(2000)  # 每2秒更新一次
+        self._disk_futures = {}  # 挂载点 -> 最近一次磁盘使用情况查询
         
-
+        # 采集线程的第一次结果要等一个间隔（CPU使用率需要统计周期），内存先直接显示一次
+        # 磁盘显示在创建时已经填好
+        self._update_memory_display(read_memory())
         
-        self.update_stats()  # 初始更新
+        # 在后台线程中采集数据（读取/proc或磁盘可能很慢），界面线程只负责更新控件
+        self.sampler = StatsSampler(self._collect_stats, self.SAMPLE_INTERVAL, self)
+        self.sampler.stats_sampled.connect(self.update_stats)
+        self.sampler.start()
+    
+    # 采集间隔（秒），窗口最小化时降低频率
+    SAMPLE_INTERVAL = 2
+    MINIMIZED_INTERVAL = 30
+    
+    def _update_sample_interval(self):
+        """按窗口状态调整采集间隔：隐藏时暂停，最小化时降低频率"""
+        if not self.isVisible():
+            self.sampler.set_interval(None)
+        elif self.isMinimized():
+            self.sampler.set_interval(self.MINIMIZED_INTERVAL)
+        else:
+            self.sampler.set_interval(self.SAMPLE_INTERVAL)
+    
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            self._update_sample_interval()
+        super().changeEvent(event)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._update_sample_interval()
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._update_sample_interval()
     
     def closeEvent(self, event):
         """关闭窗口时的处理"""
+        self.sampler.stop()
+        self.sampler.wait()  # 等待采集线程结束
         event.accept()
         
     def setup_system_info(self):
@@ -84,27 +225,34 @@ class SystemMonitor(QMainWindow):
     
 
     
+    # 颜色 -> (调色板, 样式表)，相同颜色的进度条共用
+    _STYLE_CACHE = {}
+    
     def set_progress_bar_style(self, progress_bar, color):
         """设置进度条样式"""
-        # 创建调色板
-        palette = QPalette()
-        # 设置进度条颜色
-        palette.setColor(QPalette.Highlight, QColor(color))
-        # 应用调色板
+        style = self._STYLE_CACHE.get(color)
+        if style is None:
+            # 创建调色板，设置进度条颜色
+            palette = QPalette()
+            palette.setColor(QPalette.Highlight, QColor(color))
+            # 样式表
+            style_sheet = f"""
+                QProgressBar {{
+                    border: 1px solid #bbb;
+                    border-radius: 4px;
+                    text-align: center;
+                    height: 20px;
+                }}
+                QProgressBar::chunk {{
+                    background-color: {color};
+                    border-radius: 3px;
+                }}
+            """
+            style = self._STYLE_CACHE[color] = (palette, style_sheet)
+        
+        palette, style_sheet = style
         progress_bar.setPalette(palette)
-        # 设置样式表
-        progress_bar.setStyleSheet(f"""
-            QProgressBar {{
-                border: 1px solid #bbb;
-                border-radius: 4px;
-                text-align: center;
-                height: 20px;
-            }}
-            QProgressBar::chunk {{
-                background-color: {color};
-                border-radius: 3px;
-            }}
-        """)
+        progress_bar.setStyleSheet(style_sheet)
     
     def setup_cpu_usage(self):
         """设置CPU使用率显示"""
@@ -117,6 +265,7 @@ class SystemMonitor(QMainWindow):
         self.cpu_percent.setAlignment(Qt.AlignCenter)
         # 设置进度条颜色
         self.set_progress_bar_style(self.cpu_percent, "#e74c3c")  # 红色
+        self._last_cpu_value = -1  # 上次显示的值，没变化时不更新控件
         
         self.cpu_count_label = QLabel()
         
@@ -140,6 +289,8 @@ class SystemMonitor(QMainWindow):
         self.set_progress_bar_style(self.memory_percent, "#2ecc71")  # 绿色
         
         self.memory_label = QLabel()
+        self._last_memory_value = -1  # 上次显示的内容，没变化时不更新控件
+        self._last_memory_text = ""
         
         layout.addWidget(QLabel("内存使用:"))
         layout.addWidget(self.memory_percent)
@@ -152,8 +303,60 @@ class SystemMonitor(QMainWindow):
         """设置磁盘使用情况显示"""
         group = QGroupBox("磁盘使用情况")
         self.disk_layout = QVBoxLayout()
+        self.disk_bars = {}
         
-        # 获取所有磁盘分区
+        self._build_disk_displays()
+        
+        group.setLayout(self.disk_layout)
+        self.layout.addWidget(group)
+        
+        # 挂载变化时重新创建磁盘显示（短时间内的多次通知只处理一次）
+        self._disk_rebuild_timer = QTimer(self)
+        self._disk_rebuild_timer.setSingleShot(True)
+        self._disk_rebuild_timer.setInterval(500)
+        self._disk_rebuild_timer.timeout.connect(self._build_disk_displays)
+        self._watching_mounts = self._watch_mount_changes()
+    
+    def _watch_mount_changes(self):
+        """监听挂载变化，不支持时返回False（改为定期检查）"""
+        os_name = platform.system()
+        if os_name == "Windows":
+            # Windows在nativeEvent中处理WM_DEVICECHANGE消息
+            return True
+        if os_name != "Linux":
+            return False
+        
+        # 挂载表变化时/proc/self/mounts会产生异常事件（poll的POLLPRI）
+        try:
+            self._mounts_file = open('/proc/self/mounts', 'rb')
+        except OSError:
+            return False
+        self._mount_notifier = QSocketNotifier(self._mounts_file.fileno(), QSocketNotifier.Exception, self)
+        self._mount_notifier.activated.connect(self._on_mounts_changed)
+        return True
+    
+    def _on_mounts_changed(self):
+        """挂载表发生变化"""
+        # 重新读取文件才会清除事件
+        self._mounts_file.seek(0)
+        self._mounts_file.read()
+        self._disk_rebuild_timer.start()
+    
+    def nativeEvent(self, event_type, message):
+        """Windows上插拔磁盘时重新创建磁盘显示"""
+        if platform.system() == "Windows" and event_type == b"windows_generic_MSG":
+            msg = ctypes.wintypes.MSG.from_address(int(message))
+            if msg.message == WM_DEVICECHANGE:
+                self._disk_rebuild_timer.start()
+        return super().nativeEvent(event_type, message)
+    
+    def _build_disk_displays(self):
+        """枚举磁盘分区并创建对应的显示组件"""
+        # 移除原有的磁盘显示
+        while self.disk_layout.count():
+            widget = self.disk_layout.takeAt(0).widget()
+            if widget is not None:
+                widget.deleteLater()
         self.disk_bars = {}
         
         # 检测操作系统类型
@@ -164,11 +367,8 @@ class SystemMonitor(QMainWindow):
         
         # 如果是Windows系统，显示更友好的盘符号
         if os_name == "Windows":
-            import string
-            import os
-            
             # 获取Windows上的磁盘
-            drives = [f"{d}:\\" for d in string.ascii_uppercase if os.path.exists(f"{d}:\\")]
+            drives = windows_drives()
             for drive in drives:
                 try:
                     usage = psutil.disk_usage(drive)
@@ -201,27 +401,20 @@ class SystemMonitor(QMainWindow):
                 except Exception as e:
                     print(f"Error getting disk usage for {part.mountpoint}: {e}")
         
-        group.setLayout(self.disk_layout)
-        self.layout.addWidget(group)
+        # 缓存需要更新的挂载点，分区列表只在挂载变化时（或定期）重新检查
+        self._mount_points = list(self.disk_bars)
+        self._last_partition_scan = time.monotonic()
     
     def _add_disk_display(self, disk_name, mount_point, usage):
         """添加磁盘显示组件"""
         disk_group = QGroupBox(disk_name)
         disk_layout = QHBoxLayout()  # 使用水平布局更美观
         
-        # 左侧信息区
-        info_layout = QVBoxLayout()
-        
-        # 添加容量信息
-        capacity_label = QLabel(f"总容量: {self.format_bytes(usage.total)}")
-        free_label = QLabel(f"可用空间: {self.format_bytes(usage.free)}")
-        used_label = QLabel(f"已用空间: {self.format_bytes(usage.used)}")
-        percent_label = QLabel(f"使用率: {usage.percent}%")
-        
-        info_layout.addWidget(capacity_label)
-        info_layout.addWidget(free_label)
-        info_layout.addWidget(used_label)
-        info_layout.addWidget(percent_label)
+        # 左侧信息区，容量信息放在同一个标签中分行显示，每次更新只需设置一次文本
+        # 总容量只有重新挂载时才会变化，挂载变化时会重新创建整个显示，所以只格式化一次
+        capacity_text = f"总容量: {self.format_bytes(usage.total)}"
+        info_label = QLabel(self._disk_info_text(capacity_text, usage))
+        info_label.setTextFormat(Qt.PlainText)
         
         # 右侧进度条
         progress_layout = QVBoxLayout()
@@ -232,6 +425,7 @@ class SystemMonitor(QMainWindow):
         disk_bar.setFixedHeight(20)  # 设置固定高度
         disk_bar.setMinimumWidth(150)  # 设置最小宽度
         disk_bar.setFormat("%p%")
+        disk_bar.setValue(int(usage.percent))
         # 设置进度条颜色 - 每个磁盘使用不同颜色
         self.set_progress_bar_style(disk_bar, "#9b59b6")  # 紫色
         
@@ -241,79 +435,146 @@ class SystemMonitor(QMainWindow):
         progress_layout.addStretch()
         
         # 将信息区和进度条添加到水平布局
-        disk_layout.addLayout(info_layout)
+        disk_layout.addWidget(info_label)
         disk_layout.addLayout(progress_layout)
         
         disk_group.setLayout(disk_layout)
         self.disk_layout.addWidget(disk_group)
         
-        # 存储引用以便更新
-        self.disk_bars[mount_point] = (disk_bar, percent_label, capacity_label, free_label, used_label)
+        # 存储引用以便更新，最后一个字典记录上次显示的内容
+        self.disk_bars[mount_point] = (disk_bar, info_label, capacity_text,
+                                       {'pct': int(usage.percent), 'raw': (usage.free, usage.used), 'info': info_label.text()})
+    
+    def _disk_info_text(self, capacity_text, usage):
+        """磁盘信息标签的文本"""
+        return DISK_INFO_TEMPLATE.format(
+            capacity=capacity_text,
+            free=self.format_bytes(usage.free),
+            used=self.format_bytes(usage.used),
+            percent=usage.percent,
+        )
+        
+    def update_stats(self, sample_no, stats):
+        """用采集线程发来的数据更新界面"""
+        # 界面线程卡顿时会积压多个结果，只显示最新的一个
+        if sample_no < self.sampler.sample_count:
+            return
+        cpu_percent, memory, disk_usages = stats
         
-    def update_stats(self):
-        """更新统计信息"""
-        # 更新CPU使用率
-        cpu_percent = psutil.cpu_percent(interval=0.1)  # 缩短间隔以加快更新
-        self.cpu_percent.setValue(int(cpu_percent))
+        # 更新CPU使用率（数值没变时不调用控件，避免无谓的重绘）
+        cpu_value = int(cpu_percent)
+        if cpu_value != self._last_cpu_value:
+            self._last_cpu_value = cpu_value
+            self.cpu_percent.setValue(cpu_value)
         
         # 更新内存使用情况
-        memory = psutil.virtual_memory()
-        self.memory_percent.setValue(int(memory.percent))
-        self.memory_label.setText(
+        self._update_memory_display(memory)
+        
+        # 更新磁盘使用情况
+        for mount_point, usage in disk_usages.items():
+            self._update_disk_display(mount_point, usage)
+    
+    def _update_memory_display(self, memory):
+        """更新内存显示信息"""
+        memory_value = int(memory.percent)
+        if memory_value != self._last_memory_value:
+            self._last_memory_value = memory_value
+            self.memory_percent.setValue(memory_value)
+        memory_text = (
             f"已用: {self.format_bytes(memory.used)} / "
             f"总共: {self.format_bytes(memory.total)} "
             f"({memory.percent}%)"
         )
-        
-        # 更新磁盘使用情况
-        self._update_disk_usage()
+        if memory_text != self._last_memory_text:
+            self._last_memory_text = memory_text
+            self.memory_label.setText(memory_text)
     
-    def _update_disk_usage(self):
-        """更新磁盘使用情况"""
-        # 检测操作系统类型
-        os_name = platform.system()
-        
-        if os_name == "Windows":
-            import string
-            import os
-            # 获取Windows上的磁盘
-            drives = [f"{d}:\\" for d in string.ascii_uppercase if os.path.exists(f"{d}:\\")]
-            for drive in drives:
-                if drive in self.disk_bars:
-                    try:
-                        usage = psutil.disk_usage(drive)
-                        self._update_disk_display(drive, usage)
-                    except Exception as e:
-                        print(f"Error updating disk {drive}: {e}")
-        else:
-            # macOS或Linux
-            for part in psutil.disk_partitions():
-                if part.mountpoint in self.disk_bars:
-                    try:
-                        usage = psutil.disk_usage(part.mountpoint)
-                        self._update_disk_display(part.mountpoint, usage)
-                    except Exception as e:
-                        print(f"Error updating disk {part.mountpoint}: {e}")
+    def _collect_stats(self):
+        """采集CPU、内存和磁盘数据，返回(CPU使用率, 内存信息, {挂载点: 磁盘使用情况})，在采集线程中调用"""
+        cpu_percent = psutil.cpu_percent(interval=None)  # 不阻塞界面线程，统计周期即定时器间隔
+        memory = read_memory()
+        return cpu_percent, memory, self._collect_disk_usage()
+    
+    # 重新检查分区是否仍然挂载的间隔（秒）
+    PARTITION_SCAN_INTERVAL = 60
+    # 等待磁盘使用情况查询的最长时间（秒）
+    DISK_USAGE_TIMEOUT = 1.5
+    
+    def _collect_disk_usage(self):
+        """采集已显示磁盘的使用情况"""
+        # 分区很少变化，不必每次都枚举；无法监听挂载变化时才定期检查已显示的磁盘是否仍然存在
+        now = time.monotonic()
+        if not self._watching_mounts and now - self._last_partition_scan > self.PARTITION_SCAN_INTERVAL:
+            self._last_partition_scan = now
+            shown = list(self.disk_bars)  # 界面线程可能同时重建磁盘显示，先取一份副本
+            if platform.system() == "Windows":
+                present = set(windows_drives())
+                self._mount_points = [drive for drive in shown if drive in present]
+            else:
+                mounted = {part.mountpoint for part in psutil.disk_partitions()}
+                self._mount_points = [mp for mp in shown if mp in mounted]
+        
+        # 各挂载点并发查询，一个慢的网络磁盘不会拖慢其他磁盘
+        # 上次的查询还没返回的挂载点不再重复提交，每个卡住的挂载点最多占用一个线程
+        for mount_point in self._mount_points:
+            future = self._disk_futures.get(mount_point)
+            if future is None or future.done():
+                self._disk_futures[mount_point] = self._query_disk_usage(mount_point)
+        futures = {mp: self._disk_futures[mp] for mp in self._mount_points}
+        wait(futures.values(), timeout=self.DISK_USAGE_TIMEOUT)
+        
+        disk_usages = {}
+        for mount_point, future in futures.items():
+            if not future.done():
+                continue  # 超时的磁盘本次不更新
+            try:
+                disk_usages[mount_point] = future.result()
+            except Exception as e:
+                print(f"Error updating disk {mount_point}: {e}")
+        return disk_usages
+    
+    @staticmethod
+    def _query_disk_usage(mount_point):
+        """在后台线程中查询磁盘使用情况，返回Future"""
+        future = Future()
+        
+        def query():
+            try:
+                future.set_result(psutil.disk_usage(mount_point))
+            except Exception as e:
+                future.set_exception(e)
+        
+        # 使用守护线程：卡住的网络磁盘查询不会阻止程序退出（线程池的工作线程会在退出时被等待）
+        threading.Thread(target=query, daemon=True).start()
+        return future
     
     def _update_disk_display(self, mount_point, usage):
         """更新磁盘显示信息"""
         if mount_point in self.disk_bars:
-            disk_bar, percent_label, capacity_label, free_label, used_label = self.disk_bars[mount_point]
-            disk_bar.setValue(int(usage.percent))
-            percent_label.setText(f"使用率: {usage.percent}%")
-            free_label.setText(f"可用空间: {self.format_bytes(usage.free)}")
-            used_label.setText(f"已用空间: {self.format_bytes(usage.used)}")
-            # 总容量一般不会变化，但为了完整性也更新
-            capacity_label.setText(f"总容量: {self.format_bytes(usage.total)}")
+            disk_bar, info_label, capacity_text, last = self.disk_bars[mount_point]
+            # 只更新与上次显示不同的控件；字节数按格式化后的文本比较，细小变化不会触发重绘
+            pct = int(usage.percent)
+            if pct != last['pct']:
+                last['pct'] = pct
+                disk_bar.setValue(pct)
+            # 字节数完全没变时连文本都不必生成
+            raw = (usage.free, usage.used)
+            if raw == last['raw']:
+                return
+            last['raw'] = raw
+            text = self._disk_info_text(capacity_text, usage)
+            if text != last['info']:
+                last['info'] = text
+                info_label.setText(text)
     
     @staticmethod
     def format_bytes(bytes_num):
         """格式化字节大小为易读格式"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if bytes_num < 1024.0:
-                return f"{bytes_num:.1f} {unit}"
-            bytes_num /= 1024.0
-        return f"{bytes_num:.1f} PB"
+        if bytes_num < 1:
+            return f"{bytes_num:.1f} B"
+        # 由二进制位数直接算出单位，不必循环除以1024
+        i = min(5, (int(bytes_num).bit_length() - 1) // 10)
+        return f"{bytes_num / (1 << (10 * i)):.1f} {BYTE_UNITS[i]}"
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)